@@ -0,0 +1,186 @@
+import numpy as np
+
+"""
+Vectorized Gomoku environment that steps many games at once.
+
+The boards are kept in one int8 array of shape (n_games, size, size) with EMPTY, X and O cells.
+Every call to `step` applies one move per game and checks only the lines through the new stones,
+by gathering up to `pieces_in_row_to_win` cells in each of the 4 directions for all games together.
+The win rule is the same as `Gomoku._check_winner`: a line of exactly `pieces_in_row_to_win` stones.
+"""
+
+EMPTY = 0
+X = 1
+O = 2
+PIECES = {X: 'X', O: 'O'}
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+class BatchGomoku:
+
+    #-----------| Init |-----------#
+    def __init__(self, n_games, size = 15, pieces_in_row_to_win = 5, seed=None):
+        self.n_games = n_games
+        self.size = size
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((n_games, size, size), dtype=np.int8)
+        self.current_player = np.full(n_games, X, dtype=np.int8)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.winner = np.zeros(n_games, dtype=np.int8)
+        self.empty_space = np.full(n_games, size * size, dtype=np.int32)
+        self._games = np.arange(n_games)
+
+    def reset(self, games=None):
+        """
+        Clear the given games (all of them by default) back to an empty board with X to move.
+        """
+        games = self._games if games is None else games
+        self.boards[games] = EMPTY
+        self.current_player[games] = X
+        self.done[games] = False
+        self.winner[games] = EMPTY
+        self.empty_space[games] = self.size * self.size
+
+    #----------| Public |----------#
+    def step(self, moves):
+        """
+        Apply one move per game. Moves of finished games and moves on occupied cells are ignored,
+        and the side to move of those games does not change.
+
+        Args:
+        moves (np.ndarray): Flat cell indices (x * size + y) of shape (n_games,).
+
+        Returns:
+        (rewards, done, valid) where rewards has shape (n_games, 2) with the (X, O) scores of the games
+        that ended on this step (1.0 win, 0.0 loss, 0.5 draw, 0 otherwise), done flags every finished
+        game and valid flags the moves that were applied.
+        """
+        moves = np.asarray(moves)
+        xs, ys = np.divmod(moves, self.size)
+        valid = ~self.done & (self.boards[self._games, xs, ys] == EMPTY)
+        games, xs, ys = self._games[valid], xs[valid], ys[valid]
+        players = self.current_player[games]
+        self.boards[games, xs, ys] = players
+        self.empty_space[games] -= 1
+
+        won = self._check_winner(games, xs, ys, players)
+        drawn = ~won & (self.empty_space[games] == 0)
+
+        rewards = np.zeros((self.n_games, 2), dtype=np.float32)
+        winners = games[won]
+        rewards[winners, self.current_player[winners] - 1] = 1.0
+        rewards[games[drawn]] = 0.5
+        self.winner[winners] = self.current_player[winners]
+        self.done[winners] = True
+        self.done[games[drawn]] = True
+
+        playing = games[~self.done[games]]
+        self.current_player[playing] = 3 - self.current_player[playing]
+        return rewards, self.done.copy(), valid
+
+    def legal_moves(self):
+        """
+        Return a (n_games, size * size) bool mask of the empty cells of the games still being played.
+        """
+        return (self.boards.reshape(self.n_games, -1) == EMPTY) & ~self.done[:, None]
+
+    def random_moves(self):
+        """
+        Pick one uniformly random empty cell per game. Finished games get move 0, which `step` ignores.
+        """
+        weights = self.rng.random((self.n_games, self.size * self.size)) * self.legal_moves()
+        return weights.argmax(axis=1)
+
+    def play(self, policy_x=None, policy_o=None):
+        """
+        Play every game to the end. A policy is a callable taking this environment and returning one
+        flat move per game; `random_moves` is used when a policy is not given.
+
+        Returns:
+        A (n_games, 2) array with the (X, O) score of each game, as `GomokuGame.run_game` returns them.
+        """
+        policies = {X: policy_x or BatchGomoku.random_moves, O: policy_o or BatchGomoku.random_moves}
+        results = np.zeros((self.n_games, 2), dtype=np.float32)
+        while not self.done.all():
+            moves = np.zeros(self.n_games, dtype=np.int64)
+            for player, policy in policies.items():
+                to_move = ~self.done & (self.current_player == player)
+                if to_move.any():
+                    moves[to_move] = policy(self)[to_move]
+            rewards, _, _ = self.step(moves)
+            results += rewards
+        return results
+
+    def get_game_state(self, game):
+        """
+        Get the state of one game in the same format as `Gomoku.get_game_state`, so any `Player` can be
+        asked for a move.
+        """
+        board = [[' ' if cell == EMPTY else PIECES[cell] for cell in row] for row in self.boards[game].tolist()]
+        return {
+            "board": board,
+            "current_player": PIECES[int(self.current_player[game])],
+            "game_over": bool(self.done[game]),
+            "winner": PIECES.get(int(self.winner[game]))
+        }
+
+    #--------| Policies |---------#
+    def player_policy(self, player):
+        """
+        Wrap a `Player` as a batch policy by asking it for a move in every game still being played.
+        """
+        def policy(env):
+            moves = np.zeros(env.n_games, dtype=np.int64)
+            for game in np.flatnonzero(~env.done):
+                x, y = player.get_move(env.get_game_state(game))
+                moves[game] = x * env.size + y
+            return moves
+        return policy
+
+    def qtable_policy(self, qtable):
+        """
+        Greedy policy over a `QTable`, breaking ties at random. States missing from the table are played
+        at random, without being added to it.
+        """
+        def policy(env):
+            moves = env.random_moves()
+            legal = env.legal_moves()
+            for game in np.flatnonzero(~env.done):
+                state = env.serialize_board(game)
+                if state in qtable:
+                    values = np.where(legal[game], qtable.get_values(state, range(env.size * env.size)), -np.inf)
+                    best = np.flatnonzero(values == values.max())
+                    moves[game] = env.rng.choice(best)
+            return moves
+        return policy
+
+    def serialize_board(self, game):
+        """
+        Serialize one board the same way `QPlayer._serialize_board` does, from the side to move's view.
+        """
+        cells = self.boards[game].ravel()
+        player = self.current_player[game]
+        return ''.join(np.where(cells == EMPTY, 'E', np.where(cells == player, 'P', 'R')))
+
+    #---------| Private |---------#
+    def _check_winner(self, games, xs, ys, players):
+        """
+        Check, for every game that just moved, if the new stone is part of a line of exactly
+        `pieces_in_row_to_win` stones.
+        """
+        won = np.zeros(len(games), dtype=bool)
+        k = self.pieces_in_row_to_win
+        for dx, dy in DIRECTIONS:
+            count = np.ones(len(games), dtype=np.int32)
+            for sign in (1, -1):
+                running = np.ones(len(games), dtype=bool)
+                for step in range(1, k + 1):
+                    nx = xs + sign * dx * step
+                    ny = ys + sign * dy * step
+                    on_board = (nx >= 0) & (nx < self.size) & (ny >= 0) & (ny < self.size)
+                    cells = self.boards[games, np.clip(nx, 0, self.size - 1), np.clip(ny, 0, self.size - 1)]
+                    running &= on_board & (cells == players)
+                    count += running
+            won |= count == k
+        return won
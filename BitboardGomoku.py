@@ -0,0 +1,246 @@
+class BitboardGomoku:
+    def __init__(self, size = 15, pieces_in_row_to_win = 5, starting_board=None, next_player=None):
+        """
+        Initialize a bitboard-backed Gomoku game. Each player's stones are kept in an integer mask where
+        cell (x, y) is bit x * (size + 1) + y. The extra padding column keeps shifted masks from wrapping
+        from one row into the next, so lines can be followed with plain shifts.
+
+        The `move(x, y)` / `get_game_state()` contract is the same as `Gomoku`, so this class can be passed
+        as the engine of a `GomokuGame`. Search players can use `make_move` / `unmake_move` directly.
+        """
+        self.size = size
+        self.width = size + 1
+        self.players = ['X', 'O']
+        self.current_player = self.players[0] if next_player is None else next_player
+        self.game_over = False
+        self.winner = None
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        # Shifts for the 4 line directions: (0, 1), (1, 0), (1, 1), (1, -1)
+        self.shifts = (1, self.width, self.width + 1, self.width - 1)
+        self.full_mask = 0
+        for x in range(size):
+            self.full_mask |= ((1 << size) - 1) << (x * self.width)
+        self.masks = {'X': 0, 'O': 0}
+        self.history = []
+        self.board = [[' ' for _ in range(self.size)] for _ in range(self.size)] if starting_board is None else starting_board
+        for x, row in enumerate(self.board):
+            for y, piece in enumerate(row):
+                if piece != ' ':
+                    self.masks[piece] |= 1 << self.index(x, y)
+        self._empty_space = bin(self.full_mask & ~(self.masks['X'] | self.masks['O'])).count('1')
+
+    @classmethod
+    def from_masks(cls, size, pieces_in_row_to_win, masks, next_player):
+        """
+        Build a game from a {'X': mask, 'O': mask} pair, e.g. a position sent to another process.
+        """
+        width = size + 1
+        board = [[' ' for _ in range(size)] for _ in range(size)]
+        for player, mask in masks.items():
+            while mask:
+                low_bit = mask & -mask
+                x, y = divmod(low_bit.bit_length() - 1, width)
+                board[x][y] = player
+                mask ^= low_bit
+        return cls(size=size, pieces_in_row_to_win=pieces_in_row_to_win, starting_board=board, next_player=next_player)
+
+    def print_board(self):
+        """
+        Print the current state of the game board. Empty spots are represented by ' ',
+        and players' pieces are represented by 'X' and 'O'.
+        """
+        print('  ' + ' '.join([format(i, 'X') for i in range(self.size)]))
+        for i, row in enumerate(self.board):
+            print(format(i, 'X') + ' ' + ' '.join(row))
+        print()
+
+    def move(self, x, y):
+        """
+        Make a move. The current player places a piece at the specified coordinates (x, y).
+
+        Args:
+        x (int): The x-coordinate of the move.
+        y (int): The y-coordinate of the move.
+
+        Returns:
+        True if the move is successful and the game goes on, False otherwise.
+        """
+        if self.game_over or self.board[x][y] != ' ':
+            return False
+        self.make_move(self.index(x, y))
+        return not self.game_over
+
+    def get_game_state(self):
+        """
+        Get the current game state.
+
+        Returns:
+        A dictionary representing the game state. The keys are "board", "current_player",
+        "game_over", "winner" and "pieces_in_row_to_win", and the corresponding values represent the
+        state of the game.
+        """
+        return {
+            "board": self.board,
+            "current_player": self.current_player,
+            "game_over": self.game_over,
+            "winner": self.winner,
+            "pieces_in_row_to_win": self.pieces_in_row_to_win
+        }
+
+    #-------| Bitboard API |--------#
+    def index(self, x, y):
+        """
+        Return the bit index of cell (x, y).
+        """
+        return x * self.width + y
+
+    def coords(self, index):
+        """
+        Return the (x, y) cell of a bit index.
+        """
+        return divmod(index, self.width)
+
+    def occupied(self):
+        """
+        Return the mask of all stones on the board.
+        """
+        return self.masks['X'] | self.masks['O']
+
+    def empty_mask(self):
+        """
+        Return the mask of all empty cells.
+        """
+        return self.full_mask & ~(self.masks['X'] | self.masks['O'])
+
+    def legal_moves(self):
+        """
+        Yield the bit index of every empty cell, or nothing if the game is over.
+        """
+        if self.game_over:
+            return
+        empty = self.empty_mask()
+        while empty:
+            low_bit = empty & -empty
+            yield low_bit.bit_length() - 1
+            empty ^= low_bit
+
+    def candidate_indices(self, radius=1):
+        """
+        Return the bit indices of the empty cells within `radius` of a stone, the same candidates as
+        `Gomoku.candidate_moves`. On an empty board the only candidate is the center; with radius None,
+        or when no empty cell is near a stone, every empty cell is. Nothing once the game is over.
+        """
+        if self.game_over:
+            return []
+        occupied = self.occupied()
+        if radius is None:
+            return list(self.legal_moves())
+        if not occupied:
+            return [self.index(self.size // 2, self.size // 2)]
+        near = occupied
+        for _ in range(radius):
+            grown = near
+            for shift in self.shifts:
+                grown |= (near << shift) | (near >> shift)
+            # Drop the bits shifted into the padding column, or the next step wraps them to another row
+            near = grown & self.full_mask
+        near &= self.empty_mask()
+        moves = []
+        while near:
+            low_bit = near & -near
+            moves.append(low_bit.bit_length() - 1)
+            near ^= low_bit
+        return moves or list(self.legal_moves())
+
+    def candidate_moves(self, radius=1):
+        """
+        Generate the (x, y) cells of `candidate_indices`, like `Gomoku.candidate_moves`.
+        """
+        for index in self.candidate_indices(radius):
+            yield self.coords(index)
+
+    def make_move(self, index):
+        """
+        Place a stone for the current player at a bit index and push it on the move stack. The caller
+        must make sure the cell is empty and the game is not over.
+
+        Args:
+        index (int): The bit index of the move.
+
+        Returns:
+        True if the move won the game, False otherwise.
+        """
+        player = self.current_player
+        self.masks[player] |= 1 << index
+        self.history.append(index)
+        x, y = divmod(index, self.width)
+        self.board[x][y] = player
+        self._empty_space -= 1
+        if self.is_win(self.masks[player], index):
+            self.game_over = True
+            self.winner = player
+            return True
+        if self._empty_space == 0:
+            self.game_over = True
+            return False
+        self.current_player = self.players[0] if player == self.players[1] else self.players[1]
+        return False
+
+    def unmake_move(self):
+        """
+        Take back the last move on the move stack and restore the side to move.
+
+        Returns:
+        The bit index of the move taken back.
+        """
+        index = self.history.pop()
+        x, y = divmod(index, self.width)
+        player = self.board[x][y]
+        self.masks[player] &= ~(1 << index)
+        self.board[x][y] = ' '
+        self._empty_space += 1
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return index
+
+    def is_win(self, mask, index):
+        """
+        Check if the stone at `index` is part of a line of exactly `pieces_in_row_to_win` stones of `mask`,
+        the same rule `Gomoku._check_winner` uses.
+
+        Args:
+        mask (int): The stones of the player who moved.
+        index (int): The bit index of the move.
+
+        Returns:
+        True if the move completes a winning line, False otherwise.
+        """
+        for shift in self.shifts:
+            if self._count_line(mask, index, shift) == self.pieces_in_row_to_win:
+                return True
+        return False
+
+    def is_winning_move(self, index, player=None):
+        """
+        Check if placing a stone of `player` (the current player by default) at `index` would win,
+        without changing the board.
+        """
+        player = self.current_player if player is None else player
+        return self.is_win(self.masks[player] | (1 << index), index)
+
+    # Private methods
+    def _count_line(self, mask, index, shift):
+        """
+        Count the consecutive stones of `mask` through `index` along the direction given by `shift`.
+        """
+        count = 1
+        position = index + shift
+        while (mask >> position) & 1:
+            count += 1
+            position += shift
+        position = index - shift
+        while position >= 0 and (mask >> position) & 1:
+            count += 1
+            position -= shift
+        return count
@@ -0,0 +1,105 @@
+import os
+import pickle
+import threading
+import time
+
+"""
+Periodic, atomic checkpoints of a training run.
+
+The training loop asks `due(episode)` after every episode (or round, in parallel mode), and when a
+checkpoint is due it hands `save` a snapshot of its state: the copy is taken by the loop, so the state
+cannot change while it is written, and everything slower (pickling and writing the file) happens on a
+background thread. Only the latest snapshot is kept: if the previous one is still being written, the
+next one replaces any snapshot still waiting instead of queueing behind it.
+
+A checkpoint is written to `<file_path>.tmp`, flushed to disk and renamed over `file_path`, so the file
+always holds the last complete checkpoint, whatever moment the run is killed at.
+"""
+
+
+class Checkpointer:
+
+    #-----------| Init |-----------#
+    def __init__(self, file_path, every_episodes=0, every_seconds=0):
+        self.file_path = file_path
+        # A checkpoint is due every `every_episodes` episodes or `every_seconds` seconds (0 disables either)
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.written = 0
+        self._last_episode = 0
+        self._last_time = time.monotonic()
+        self._pending = None
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def load(file_path):
+        """
+        Get the state of the last checkpoint written to `file_path`, or None if there is none.
+        """
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return pickle.load(f)
+
+    #----------| Public |----------#
+    def start_from(self, episode):
+        # Count the next interval from a resumed episode
+        self._last_episode = episode
+
+    def due(self, episode):
+        if self.every_episodes and episode - self._last_episode >= self.every_episodes:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self._last_time >= self.every_seconds
+
+    def save(self, episode, state):
+        """
+        Queue `state` to be written by the background thread. The caller must not modify it afterwards.
+        """
+        self._raise_error()
+        self._last_episode = episode
+        self._last_time = time.monotonic()
+        with self._condition:
+            self._pending = state
+            self._condition.notify()
+
+    def close(self):
+        """
+        Wait for the pending checkpoint to be written and stop the background thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._raise_error()
+
+    #---------| Private |---------#
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+            try:
+                self._write(state)
+                self.written += 1
+            except Exception as e:
+                self._error = e
+
+    def _write(self, state):
+        temporary_path = f'{self.file_path}.tmp'
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.file_path)
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f'Writing checkpoint {self.file_path} failed') from error
@@ -0,0 +1,85 @@
+import math
+import random
+
+"""
+Exploration schedules of the Q players: how a move is picked among the valid actions of a known state
+from their Q-values.
+
+    Greedy          the best action, at random among ties (the players' historical behavior)
+    EpsilonGreedy   a random action with probability epsilon, the greedy one otherwise
+    Softmax         an action drawn with probability proportional to exp(value / temperature)
+
+Epsilon and the temperature decay linearly from `start` to `end` over `decay_episodes` episodes, and
+stay at `end` afterwards. The player calls `end_episode` after every game. All draws go through the
+random module, so a seeded (or checkpointed) run replays the same moves.
+"""
+
+
+class Greedy:
+
+    def __init__(self):
+        self.episode = 0
+
+    def select(self, values):
+        """
+        Get the index of the action to play among `values`.
+        """
+        max_value = max(values)
+        return random.choice([index for index, value in enumerate(values) if value == max_value])
+
+    def end_episode(self):
+        self.episode += 1
+
+
+class _Scheduled(Greedy):
+
+    def __init__(self, start, end, decay_episodes):
+        super().__init__()
+        self.start = start
+        self.end = end
+        self.decay_episodes = decay_episodes
+
+    @property
+    def rate(self):
+        if self.episode >= self.decay_episodes:
+            return self.end
+        return self.start + (self.end - self.start) * self.episode / self.decay_episodes
+
+
+class EpsilonGreedy(_Scheduled):
+
+    def __init__(self, start=0.3, end=0.01, decay_episodes=10000):
+        super().__init__(start, end, decay_episodes)
+
+    def select(self, values):
+        if random.random() < self.rate:
+            return random.randrange(len(values))
+        return super().select(values)
+
+
+class Softmax(_Scheduled):
+
+    def __init__(self, start=5.0, end=0.1, decay_episodes=10000):
+        super().__init__(start, end, decay_episodes)
+
+    def select(self, values):
+        temperature = self.rate
+        if temperature <= 0:
+            return super().select(values)
+        # Shifted by the best value, so exp never overflows
+        max_value = max(values)
+        weights = [math.exp((value - max_value) / temperature) for value in values]
+        return random.choices(range(len(values)), weights)[0]
+
+
+EXPLORATIONS = {'greedy': Greedy, 'epsilon': EpsilonGreedy, 'softmax': Softmax}
+
+
+def make_exploration(kind, start=None, end=None, decay_episodes=None):
+    """
+    Build a schedule by name, keeping the defaults of the arguments left as None.
+    """
+    if kind == 'greedy':
+        return Greedy()
+    options = {key: value for key, value in [('start', start), ('end', end), ('decay_episodes', decay_episodes)] if value is not None}
+    return EXPLORATIONS[kind](**options)
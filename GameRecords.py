@@ -0,0 +1,294 @@
+from gomoku import Gomoku
+import mmap
+import os
+import struct
+
+"""
+Compact, append-only stream of played games.
+
+A file starts with a 16-byte header (magic, version, board size, pieces in a row to win) followed by
+one record per game:
+
+    result      1 byte, 0 for a draw, 1 when 'X' won, 2 when 'O' won
+    count       varint, number of moves
+    moves       count varints, the cell index x * size + y of every move in order
+
+After every `index_every` games, and when the writer is closed, an index block is appended:
+
+    0xFF        1 byte marker
+    first game  varint, number of the first game the block covers
+    count       varint, number of games it covers
+    offsets     count varints, distance from the block back to the start of each of those games
+    previous    varint, distance back to the previous index block (0 for the first one)
+    position    8 bytes, little-endian file offset of this block
+
+A closed file ends with an index block, so a reader finds every game without scanning the records by
+following the blocks back from the end. Files that were not closed cleanly are still readable from the
+start, up to the last complete record.
+
+Readers map the file and parse it lazily, so a stream of millions of games never has to fit in memory.
+"""
+
+HEADER = struct.Struct('<4sIII')
+HEADER_SIZE = 16
+MAGIC = b'GREC'
+VERSION = 1
+INDEX_MARKER = 0xFF
+POSITION = struct.Struct('<Q')
+RESULTS = {None: 0, 'X': 1, 'O': 2}
+WINNERS = {code: winner for winner, code in RESULTS.items()}
+
+
+#----------| Varints |---------#
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, position):
+    """
+    Returns:
+    (value, position after the varint)
+    """
+    value, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class GameRecordWriter:
+
+    #-----------| Init |-----------#
+    def __init__(self, file_path, size=3, pieces_in_row_to_win=3, index_every=1024):
+        self.size = size
+        self.index_every = index_every
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            reader = GameRecordReader(file_path)
+            if (reader.size, reader.pieces_in_row_to_win) != (size, pieces_in_row_to_win):
+                raise ValueError(f'{file_path} records {reader.size}x{reader.size} games with {reader.pieces_in_row_to_win} in a row')
+            self.last_index = reader.last_index_position()
+            if self.last_index is None:
+                # Not closed cleanly: drop any record cut short, and index every game again in the
+                # next block, since the chain of index blocks ends before the newest games
+                self.pending, end = reader._scan_offsets()
+            else:
+                self.pending, end = [], len(reader.data)
+            self.games = len(reader)
+            reader.close()
+            self.file = open(file_path, 'r+b')
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.games, self.last_index = 0, None
+            self.file = open(file_path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, size, pieces_in_row_to_win).ljust(HEADER_SIZE, b'\0'))
+            self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    #----------| Public |----------#
+    def write(self, moves, winner):
+        """
+        Append one game.
+
+        Args:
+        moves (list): The (x, y) moves in the order they were played, e.g. `Gomoku.history`.
+        winner (str): 'X', 'O' or None for a draw.
+        """
+        record = bytearray([RESULTS[winner]])
+        encode_varint(len(moves), record)
+        for x, y in moves:
+            encode_varint(x * self.size + y, record)
+        self.pending.append(self.file.tell())
+        self.file.write(record)
+        self.games += 1
+        if len(self.pending) >= self.index_every:
+            self._write_index()
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.pending:
+            self._write_index()
+        self.file.close()
+
+    #---------| Private |---------#
+    def _write_index(self):
+        position = self.file.tell()
+        block = bytearray([INDEX_MARKER])
+        encode_varint(self.games - len(self.pending), block)
+        encode_varint(len(self.pending), block)
+        for offset in self.pending:
+            encode_varint(position - offset, block)
+        encode_varint(0 if self.last_index is None else position - self.last_index, block)
+        block += POSITION.pack(position)
+        self.file.write(block)
+        self.last_index = position
+        self.pending = []
+
+
+class GameRecordReader:
+
+    #-----------| Init |-----------#
+    def __init__(self, file_path):
+        self.file = open(file_path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.pieces_in_row_to_win = HEADER.unpack(self.data[:HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file_path} is not a game record file')
+        self._offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    #----------| Public |----------#
+    def __len__(self):
+        return len(self.offsets())
+
+    def __iter__(self):
+        return self.games()
+
+    def games(self, start=0):
+        """
+        Generate the (moves, winner) of every game from game number `start` on.
+        """
+        offsets = self.offsets()
+        for offset in offsets[start:]:
+            yield self._read_game(offset)[:2]
+
+    def game(self, number):
+        return self._read_game(self.offsets()[number])[:2]
+
+    def replay(self, start=0):
+        """
+        Replay every game into a Gomoku board, one move at a time.
+
+        Yields:
+        (game, x, y, winner) before each move is made, where game is the Gomoku position the move is
+        played from and winner the final result of the game. The same Gomoku object is reused for every
+        move of a game, so copy what has to be kept.
+        """
+        for moves, winner in self.games(start):
+            game = Gomoku(size=self.size, pieces_in_row_to_win=self.pieces_in_row_to_win)
+            for x, y in moves:
+                yield game, x, y, winner
+                game.move(x, y)
+
+    def offsets(self):
+        """
+        File offsets of every game, read from the index blocks when the file was closed cleanly and by
+        scanning the records otherwise.
+        """
+        if self._offsets is None:
+            self._offsets = self._offsets_from_index()
+            if self._offsets is None:
+                self._offsets = self._scan_offsets()[0]
+        return self._offsets
+
+    def last_index_position(self):
+        """
+        Offset of the index block the file ends with, or None.
+        """
+        end = len(self.data)
+        if end < HEADER_SIZE + POSITION.size:
+            return None
+        position = POSITION.unpack(self.data[end - POSITION.size:end])[0]
+        if HEADER_SIZE <= position < end - POSITION.size and self.data[position] == INDEX_MARKER:
+            # The block has to end exactly at the end of the file, which rules out a record that just
+            # happens to end in bytes looking like a position
+            try:
+                if self._read_index(position)[3] == end:
+                    return position
+            except IndexError:
+                pass
+        return None
+
+    #---------| Private |---------#
+    def _read_game(self, offset):
+        data = self.data
+        winner = WINNERS[data[offset]]
+        count, position = decode_varint(data, offset + 1)
+        moves = []
+        for _ in range(count):
+            index, position = decode_varint(data, position)
+            moves.append(divmod(index, self.size))
+        return moves, winner, position
+
+    def _read_index(self, position):
+        first, cursor = decode_varint(self.data, position + 1)
+        count, cursor = decode_varint(self.data, cursor)
+        offsets = []
+        for _ in range(count):
+            distance, cursor = decode_varint(self.data, cursor)
+            offsets.append(position - distance)
+        previous, cursor = decode_varint(self.data, cursor)
+        return first, offsets, (position - previous if previous else None), cursor + POSITION.size
+
+    def _offsets_from_index(self):
+        position = self.last_index_position()
+        if position is None:
+            return None
+        blocks = []
+        while position is not None:
+            first, offsets, position, _ = self._read_index(position)
+            blocks.append((first, offsets))
+        offsets = []
+        for first, block_offsets in reversed(blocks):
+            offsets.extend(block_offsets)
+        return offsets
+
+    def _scan_offsets(self):
+        # Returns the offsets of the complete records and the position after the last complete one
+        offsets = []
+        position, end = HEADER_SIZE, len(self.data)
+        try:
+            while position < end:
+                if self.data[position] == INDEX_MARKER:
+                    next_position = self._read_index(position)[3]
+                    if next_position > end:
+                        break
+                    position = next_position
+                    continue
+                _, _, next_position = self._read_game(position)
+                offsets.append(position)
+                position = next_position
+        except (IndexError, KeyError, struct.error):
+            # A record or block cut short by a crash ends the stream
+            pass
+        return offsets, position
+
+
+#----------| Datasets |--------#
+def opening_counts(file_path, plies):
+    """
+    Count the results of every opening of `plies` moves.
+
+    Returns:
+    A dict mapping the tuple of opening moves to [games, 'X' wins, 'O' wins, draws].
+    """
+    counts = {}
+    with GameRecordReader(file_path) as reader:
+        for moves, winner in reader:
+            if len(moves) < plies:
+                continue
+            stats = counts.setdefault(tuple(moves[:plies]), [0, 0, 0, 0])
+            stats[0] += 1
+            stats[RESULTS[winner] or 3] += 1
+    return counts
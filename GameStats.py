@@ -0,0 +1,243 @@
+import bisect
+import cProfile
+import json
+import pstats
+
+"""
+Instrumentation for GomokuGame.
+
+A GameStats object is handed to every GomokuGame that should be measured (usually one for a whole
+training run). For each player it counts moves and results, and keeps histograms of:
+
+    get_move        time spent in Player.get_move picking the move, without the update below
+    update          time of the Q-learning update a Q player makes inside get_move after every move
+                    (any player with an `update_seconds` attribute reports it)
+    engine_move     time spent in the engine's move, win check included
+    score           time spent in Player.score, where the Q players make their final reward update
+
+and the size of the player's Q-table (all the tables of a MultiQPlayer together): the latest one, and a
+series of at most SERIES_LENGTH (episode, rows) samples to follow its growth. When the series is full,
+every other sample is dropped and it samples half as often from then on, so it spans the whole run.
+Recording a sample is a perf_counter call and a bisect into fixed buckets, so it can stay on during
+training.
+
+With profile_every=N, one episode in N runs under cProfile and the profiles add up in one pstats file.
+
+The stats can be written as JSON or in the Prometheus text format.
+"""
+
+# Upper bounds of the histogram buckets in seconds: 1us, 2us, 4us, ... up to about 8s
+BUCKETS = [1e-6 * 2 ** i for i in range(24)]
+METRICS = ['get_move', 'update', 'engine_move', 'score']
+# Samples kept of the table size series
+SERIES_LENGTH = 256
+
+
+class Histogram:
+
+    #-----------| Init |-----------#
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    #----------| Public |----------#
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Upper bound of the bucket holding the q-th quantile (q between 0 and 1).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[bucket] if bucket < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.50),
+            'p90': self.percentile(0.90),
+            'p99': self.percentile(0.99)
+        }
+
+
+class Series:
+    """
+    At most `length` (step, value) samples of a value followed over a run, evenly spread over it.
+    """
+
+    #-----------| Init |-----------#
+    def __init__(self, length=SERIES_LENGTH):
+        self.length = length
+        self.every = 1
+        self.count = 0
+        self.samples = []
+
+    #----------| Public |----------#
+    def observe(self, step, value):
+        # Keeps observations 0, every, 2 * every, ...; when full, every other one of them is dropped
+        count = self.count
+        self.count += 1
+        if count % self.every:
+            return
+        if len(self.samples) == self.length:
+            self.samples = self.samples[::2]
+            self.every *= 2
+            if count % self.every:
+                return
+        self.samples.append((step, value))
+
+    def to_list(self):
+        return [list(sample) for sample in self.samples]
+
+
+class GameStats:
+
+    #-----------| Init |-----------#
+    def __init__(self, profile_every=None, profile_path='gomoku_profile.prof'):
+        self.profile_every = profile_every
+        self.profile_path = profile_path
+        self.episodes = 0
+        self.players = {}
+        self._profile = None
+        self._profile_stats = None
+
+    #----------| Public |----------#
+    def player(self, player):
+        """
+        Get the stats of a player, keyed by its name.
+        """
+        if player.name not in self.players:
+            if hasattr(player, 'update_seconds'):
+                # Turn on the player's own timing of its updates
+                player.update_seconds = 0.0
+            self.players[player.name] = {
+                'moves': 0,
+                'wins': 0,
+                'losses': 0,
+                'draws': 0,
+                'table_size': None,
+                'table_sizes': Series(),
+                'histograms': {metric: Histogram() for metric in METRICS}
+            }
+        return self.players[player.name]
+
+    def observe(self, player, metric, seconds):
+        self.player(player)['histograms'][metric].observe(seconds)
+
+    def observe_move(self, player, get_move_seconds, engine_seconds, update_seconds=None):
+        stats = self.player(player)
+        stats['moves'] += 1
+        if update_seconds is not None:
+            stats['histograms']['update'].observe(update_seconds)
+            get_move_seconds -= update_seconds
+        stats['histograms']['get_move'].observe(get_move_seconds)
+        stats['histograms']['engine_move'].observe(engine_seconds)
+
+    def start_episode(self, players=()):
+        # Registering the players first lets them time their updates from the first move
+        for player in players:
+            self.player(player)
+        self.episodes += 1
+        if self.profile_every and self.episodes % self.profile_every == 0:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def end_episode(self, players, result):
+        if self._profile is not None:
+            self._profile.disable()
+            self._add_profile(self._profile)
+            self._profile = None
+        for player, score in zip(players, result):
+            stats = self.player(player)
+            if score == 1.0:
+                stats['wins'] += 1
+            elif score == 0.0:
+                stats['losses'] += 1
+            else:
+                stats['draws'] += 1
+            table_size = _table_size(player)
+            if table_size is not None:
+                stats['table_size'] = table_size
+                stats['table_sizes'].observe(self.episodes, table_size)
+
+    def to_dict(self):
+        return {
+            'episodes': self.episodes,
+            'players': {
+                name: dict(stats, table_sizes=stats['table_sizes'].to_list(),
+                           histograms={metric: histogram.to_dict() for metric, histogram in stats['histograms'].items()})
+                for name, stats in self.players.items()
+            }
+        }
+
+    def export_json(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_prometheus(self, file_path):
+        lines = ['# TYPE gomoku_episodes_total counter', f'gomoku_episodes_total {self.episodes}']
+        for counter in ['moves', 'wins', 'losses', 'draws']:
+            lines.append(f'# TYPE gomoku_{counter}_total counter')
+            for name, stats in self.players.items():
+                lines.append(f'gomoku_{counter}_total{{player="{name}"}} {stats[counter]}')
+        lines.append('# TYPE gomoku_qtable_rows gauge')
+        for name, stats in self.players.items():
+            if stats['table_size'] is not None:
+                lines.append(f'gomoku_qtable_rows{{player="{name}"}} {stats["table_size"]}')
+        for metric in METRICS:
+            lines.append(f'# TYPE gomoku_{metric}_seconds histogram')
+            for name, stats in self.players.items():
+                histogram = stats['histograms'][metric]
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else f'{bound:.6g}'
+                    lines.append(f'gomoku_{metric}_seconds_bucket{{player="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'gomoku_{metric}_seconds_sum{{player="{name}"}} {histogram.sum}')
+                lines.append(f'gomoku_{metric}_seconds_count{{player="{name}"}} {histogram.count}')
+        with open(file_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def export(self, file_path):
+        """
+        Write the stats in the Prometheus text format for .prom files, as JSON otherwise.
+        """
+        if file_path.endswith('.prom'):
+            self.export_prometheus(file_path)
+        else:
+            self.export_json(file_path)
+
+    #---------| Private |---------#
+    def _add_profile(self, profile):
+        if self._profile_stats is not None:
+            self._profile_stats.add(profile)
+        else:
+            self._profile_stats = pstats.Stats(profile)
+        self._profile_stats.dump_stats(self.profile_path)
+
+
+def _table_size(player):
+    # Rows of a Q player's table, or of all the tables of a MultiQPlayer; None for other players
+    table = getattr(player, 'QTable', None)
+    if table is not None:
+        return len(table)
+    variants = getattr(player, 'players', None)
+    if variants and all(hasattr(variant, 'QTable') for variant in variants):
+        return sum(len(variant.QTable) for variant in variants)
+    return None
@@ -3,6 +3,7 @@ from gomoku import Gomoku  # assuming gomoku.py is the file containing the Gomok
 from Player import Player  # assuming player.py is the file containing the Player classes
 
 import logging
+from time import perf_counter
 # # Create a logger
 # logger = logging.getLogger('gomoku_logger')
 # logger.setLevel(logging.DEBUG)
@@ -19,24 +20,45 @@ import logging
 # logger.addHandler(file_handler)
 
 class GomokuGame:
-    def __init__(self, player1, player2, size = 15, pieces_in_row_to_win = 5, logger = None, starting_board=None, next_player=None, print_board=False):
-        self.game = Gomoku(size = size, pieces_in_row_to_win = pieces_in_row_to_win, starting_board=starting_board, next_player=next_player)
+    def __init__(self, player1, player2, size = 15, pieces_in_row_to_win = 5, logger = None, starting_board=None, next_player=None, print_board=False, engine=Gomoku, stats=None, log_moves=True):
+        # engine can be Gomoku or any class with the same interface, e.g. BitboardGomoku
+        self.game = engine(size = size, pieces_in_row_to_win = pieces_in_row_to_win, starting_board=starting_board, next_player=next_player)
         # Map 'X' and 'O' to player1 and player2
         self.players = {'X': player1, 'O': player2}
         self.logger = logger if logger else logging.getLogger('gomoku_logger')
         self.print_board = print_board    
+        # stats is an optional GameStats collecting timings across games
+        self.stats = stats
+        # Moves are only logged when asked for and when the logger would emit them
+        self.log_moves = log_moves and self.logger.isEnabledFor(logging.INFO)
 
     # Returns (player1 score, player2 score)
     def run_game(self,):
+        if self.stats is None:
+            return self._play()
+        self.stats.start_episode((self.players['X'], self.players['O']))
+        result = self._play()
+        self.stats.end_episode((self.players['X'], self.players['O']), result)
+        return result
+
+    def _play(self):
         # print("Welcome to the Gomoku game!")
         self.logger.info('New Game')
+        stats = self.stats
         # self.game.print_board()
-        while not self.game.get_game_state()['game_over']:
+        while not self.game.game_over:
             # print(f"Player {self.game.current_player}'s turn.")
             
             # Get the move from the current player
-            x, y = self.players[self.game.current_player].get_move(self.game.get_game_state())
-            self.logger.info(f'{self.game.current_player}: {x},{y}')
+            player = self.players[self.game.current_player]
+            if stats:
+                start = perf_counter()
+                x, y = player.get_move(self.game.get_game_state())
+                moved = perf_counter()
+            else:
+                x, y = player.get_move(self.game.get_game_state())
+            if self.log_moves:
+                self.logger.info('%s: %s,%s', self.game.current_player, x, y)
 
             # Make the move
             try:
@@ -44,6 +66,8 @@ class GomokuGame:
             except Exception as e:
                 print(e)                
                 continue
+            if stats:
+                stats.observe_move(player, moved - start, perf_counter() - moved, getattr(player, 'update_seconds', None))
 
 
             # Print the updated board
@@ -51,21 +75,29 @@ class GomokuGame:
                 self.game.print_board()
 
             # Check if the game has ended
-            if self.game.get_game_state()['game_over']:
-                winner = self.game.get_game_state()['winner']
+            if self.game.game_over:
+                winner = self.game.winner
                 if winner:
                     # print(f"Player {winner} has won!")
                     self.logger.info(f"Game ended in a win/lose!")
                     looser = self.players['O'] if 'X' == winner else self.players['X']
-                    self.players[winner].score(1.0)
-                    looser.score(0.0)
-                    self.logger.info(f"Player {winner} won!")
+                    self._score(self.players[winner], 1.0)
+                    self._score(looser, 0.0)
+                    self.logger.info("Player %s won!", winner)
                     return (1.0, 0.0) if 'X' == winner else (0.0, 1.0)
                 else:
                     # print(f"Game ended in draw!")
                     self.logger.info(f"Game ended in a draw!")
-                    self.players['X'].score(0.5)
-                    self.players['O'].score(0.5)
+                    self._score(self.players['X'], 0.5)
+                    self._score(self.players['O'], 0.5)
                     self.logger.info(f"Players are updated.")
                     return (0.5, 0.5)
         # print("Thank you for playing!")
+
+    def _score(self, player, score):
+        if self.stats is None:
+            player.score(score)
+            return
+        start = perf_counter()
+        player.score(score)
+        self.stats.observe(player, 'score', perf_counter() - start)
@@ -0,0 +1,247 @@
+from Player import Player
+from BitboardGomoku import BitboardGomoku
+from multiprocessing import Pool
+import math
+import random
+import time
+
+"""
+Monte Carlo Tree Search (UCT) player for any board size and line length.
+
+The search runs on a BitboardGomoku copy of the position. Selection, expansion and the random playouts
+all make moves on that one board and take them back afterwards, so nothing is copied per playout.
+After a move the chosen subtree is kept, and reused on the next call if the opponent answered with a
+move the tree already explored.
+
+With workers > 1, leaves are selected in batches with a virtual loss on their path, so one batch spreads
+over different leaves, and the batch's playouts run in a process pool.
+"""
+
+EXPLORATION = math.sqrt(2)
+
+
+class _Node:
+    __slots__ = ('move', 'parent', 'player', 'children', 'untried', 'visits', 'wins', 'virtual_loss')
+
+    def __init__(self, move, parent, player, untried):
+        self.move = move
+        self.parent = parent
+        # The player who made `move`; wins are counted for this player
+        self.player = player
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+        self.virtual_loss = 0
+
+
+class MCTSPlayer(Player):
+
+    #-----------| Init |-----------#
+    def __init__(self, name, pieces_in_row_to_win=5, playouts=1000, time_limit=None, radius=None, workers=1, batch_size=8, verbose=False):
+        super().__init__(name)
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        self.playouts = playouts
+        self.time_limit = time_limit
+        # Only expand empty cells within `radius` of a stone (all empty cells when None)
+        self.radius = radius
+        self.workers = workers
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.pool = None
+        self.root = None
+        self.root_position = None
+        self.total_playouts = 0
+        self.total_time = 0.0
+        self.last_search = {}
+
+    #----------| Public |----------#
+    def get_move(self, game_state):
+        board = game_state['board']
+        self.game = BitboardGomoku(size=len(board), pieces_in_row_to_win=self.pieces_in_row_to_win,
+                                   starting_board=[row[:] for row in board], next_player=game_state['current_player'])
+        self._reuse_or_new_root()
+        reused = self.root.visits
+
+        start = time.perf_counter()
+        playouts = 0
+        while self._has_budget(playouts, start):
+            if self.workers > 1:
+                playouts += self._run_batch()
+            else:
+                self._run_playout()
+                playouts += 1
+        elapsed = time.perf_counter() - start
+
+        best = max(self.root.children.values(), key=lambda child: child.visits)
+        self.total_playouts += playouts
+        self.total_time += elapsed
+        self.last_search = {
+            'playouts': playouts,
+            'reused_visits': reused,
+            'seconds': elapsed,
+            'playouts_per_second': playouts / elapsed if elapsed else 0.0,
+            'win_rate': best.wins / best.visits if best.visits else 0.0
+        }
+        if self.verbose:
+            print(f"{self.name}: {playouts} playouts ({reused} reused), {self.last_search['playouts_per_second']:.0f} playouts/s, win rate {self.last_search['win_rate']:.2f}")
+
+        # Keep the chosen subtree for the next call
+        self.game.make_move(best.move)
+        best.parent = None
+        self.root = best
+        self.root_position = self._position()
+        return self.game.coords(best.move)
+
+    def playouts_per_second(self):
+        return self.total_playouts / self.total_time if self.total_time else 0.0
+
+    def score(self, score):
+        self.root = None
+        self.root_position = None
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.verbose:
+            print(f"{self.name}: {self.total_playouts} playouts in {self.total_time:.2f}s ({self.playouts_per_second():.0f} playouts/s)")
+
+    #---------| Search |----------#
+    def _has_budget(self, playouts, start):
+        if playouts == 0:
+            return True
+        if self.time_limit is not None:
+            return time.perf_counter() - start < self.time_limit
+        return playouts < self.playouts
+
+    def _run_playout(self):
+        path = self._select_and_expand(virtual_loss=False)
+        winner = _random_playout(self.game)
+        for _ in range(len(path) - 1):
+            self.game.unmake_move()
+        self._backpropagate(path, winner)
+
+    def _run_batch(self):
+        if self.pool is None:
+            self.pool = Pool(self.workers, initializer=random.seed)
+        paths, winners, positions = [], [], []
+        for _ in range(self.workers * self.batch_size):
+            path = self._select_and_expand(virtual_loss=True)
+            paths.append(path)
+            # Leaves that already ended the game need no playout
+            if self.game.game_over:
+                winners.append(self.game.winner)
+            else:
+                winners.append(len(positions))
+                positions.append(self._position())
+            for _ in range(len(path) - 1):
+                self.game.unmake_move()
+        results = self.pool.map(_playout_position, positions)
+        winners = [results[winner] if isinstance(winner, int) else winner for winner in winners]
+        for path, winner in zip(paths, winners):
+            for node in path:
+                node.virtual_loss -= 1
+            self._backpropagate(path, winner)
+        return len(paths)
+
+    def _select_and_expand(self, virtual_loss):
+        # Walk down the tree making the moves on the board; the caller takes them back
+        node = self.root
+        path = [node]
+        while not node.untried and node.children and not self.game.game_over:
+            node = self._select_child(node)
+            self.game.make_move(node.move)
+            path.append(node)
+        if node.untried and not self.game.game_over:
+            index = random.randrange(len(node.untried))
+            move = node.untried[index]
+            node.untried[index] = node.untried[-1]
+            node.untried.pop()
+            player = self.game.current_player
+            self.game.make_move(move)
+            child = _Node(move, node, player, self._candidate_moves())
+            node.children[move] = child
+            path.append(child)
+        if virtual_loss:
+            for node in path:
+                node.virtual_loss += 1
+        return path
+
+    def _select_child(self, node):
+        log_visits = math.log(node.visits + node.virtual_loss + 1)
+        best_score, best_child = -1.0, None
+        for child in node.children.values():
+            visits = child.visits + child.virtual_loss
+            if visits == 0:
+                return child
+            score = child.wins / visits + EXPLORATION * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_score, best_child = score, child
+        return best_child
+
+    def _backpropagate(self, path, winner):
+        for node in path:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1.0
+
+    #--------| Tree reuse |--------#
+    def _reuse_or_new_root(self):
+        position = self._position()
+        if self.root is not None and self.root_position is not None and self.root_position[:3] == position[:3]:
+            previous, current = self.root_position[3], position[3]
+            new_stones = (current['X'] ^ previous['X']) | (current['O'] ^ previous['O'])
+            unchanged = (previous['X'] & current['X']) == previous['X'] and (previous['O'] & current['O']) == previous['O']
+            if unchanged and new_stones == 0 and self.root_position[4] == position[4]:
+                return
+            if unchanged and new_stones and new_stones & (new_stones - 1) == 0:
+                child = self.root.children.get(new_stones.bit_length() - 1)
+                if child is not None:
+                    child.parent = None
+                    self.root = child
+                    return
+        opponent = self.game.players[0] if self.game.current_player == self.game.players[1] else self.game.players[1]
+        self.root = _Node(None, None, opponent, self._candidate_moves())
+
+    def _position(self):
+        game = self.game
+        return (game.size, game.pieces_in_row_to_win, self.radius, dict(game.masks), game.current_player)
+
+    def _candidate_moves(self):
+        return self.game.candidate_indices(self.radius)
+
+
+#---------| Playouts |---------#
+def _random_playout(game):
+    """
+    Play random moves until the game ends, then take them all back.
+
+    Returns:
+    The winner ('X' or 'O'), or None for a draw.
+    """
+    if game.game_over:
+        return game.winner
+    empty = list(game.legal_moves())
+    made = 0
+    while True:
+        index = random.randrange(len(empty))
+        move = empty[index]
+        empty[index] = empty[-1]
+        empty.pop()
+        made += 1
+        game.make_move(move)
+        if game.game_over:
+            break
+    winner = game.winner
+    for _ in range(made):
+        game.unmake_move()
+    return winner
+
+
+def _playout_position(position):
+    size, pieces_in_row_to_win, _, masks, current_player = position
+    return _random_playout(BitboardGomoku.from_masks(size, pieces_in_row_to_win, masks, current_player))
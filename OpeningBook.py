@@ -0,0 +1,205 @@
+from Player import Player
+from gomoku import Gomoku, snapshot_of
+from Symmetry import Symmetry
+import argparse
+import hashlib
+import os
+import struct
+import time
+import numpy as np
+
+"""
+Opening book: precomputed moves for the first plies of a game, so a player can answer them instantly.
+
+The book is built offline by a search player. For each side it walks the opening tree from the empty
+board: where the book side is to move, the search picks the move that goes into the book; where the
+other side is to move, every empty cell within `radius` of a stone (of the center on an empty board) is
+followed as a reply.
+
+Positions are keyed from the side to move's point of view and canonicalized under the 8 symmetries of
+the board, so one entry answers all equivalent positions. The book file holds a fixed header and then
+the entries sorted by a 64-bit hash of the canonical key, each with the book move in the canonical
+frame. It is opened through numpy.memmap and searched by binary search.
+
+Any player can use a book by being wrapped in a BookPlayer, which plays the book move when there is one
+and asks the wrapped player otherwise.
+"""
+
+# magic, version, board size, pieces in a row to win, number of entries
+HEADER = struct.Struct('<4sIIIQ')
+HEADER_SIZE = 32
+MAGIC = b'BOOK'
+VERSION = 1
+ENTRY = np.dtype([('hash', '<u8'), ('move', '<u2')])
+# Byte translations from a snapshot's cells to the 'E'/'P'/'R' key of the player to move
+SERIALIZE = {player: bytes.maketrans(b' ' + player.encode('ascii') + opponent.encode('ascii'), b'EPR') for player, opponent in [('X', 'O'), ('O', 'X')]}
+
+
+def position_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('ascii'), digest_size=8).digest(), 'little')
+
+
+class OpeningBook:
+
+    #-----------| Init |-----------#
+    def __init__(self, size=15, pieces_in_row_to_win=5):
+        self.size = size
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        self.symmetry = Symmetry.for_size(size)
+        # Entries added while building, hash -> move index in the canonical frame
+        self.entries = {}
+        self.hashes = np.empty(0, dtype='<u8')
+        self.moves = np.empty(0, dtype='<u2')
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as f:
+            magic, version, size, pieces_in_row_to_win, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file_path} is not an opening book')
+        book = cls(size, pieces_in_row_to_win)
+        if count:
+            entries = np.memmap(file_path, dtype=ENTRY, mode='r', offset=HEADER_SIZE, shape=(count,))
+            book.hashes, book.moves = entries['hash'], entries['move']
+        return book
+
+    #----------| Public |----------#
+    def __len__(self):
+        return len(self.hashes) + len(self.entries)
+
+    def lookup(self, game_state):
+        """
+        Get the book move (x, y) of a position, or None when the position is not in the book. Positions
+        of another board size or line length, or whose line length is unknown, are never in the book.
+        """
+        if game_state.get('pieces_in_row_to_win') != self.pieces_in_row_to_win:
+            return None
+        snapshot = snapshot_of(game_state)
+        if len(snapshot[0]) != self.size * self.size:
+            return None
+        key, transform = self._canonical_key(snapshot)
+        hash_value = position_hash(key)
+        move = self.entries.get(hash_value)
+        if move is None:
+            index = int(np.searchsorted(self.hashes, hash_value))
+            if index == len(self.hashes) or self.hashes[index] != hash_value:
+                return None
+            move = int(self.moves[index])
+        x, y = self.symmetry.from_frame(divmod(move, self.size), transform)
+        # A hash collision could name an occupied cell; never play it
+        if snapshot[0][x * self.size + y] != ord(' '):
+            return None
+        return x, y
+
+    def add(self, game_state, move):
+        key, transform = self._canonical_key(snapshot_of(game_state))
+        x, y = self.symmetry.to_frame(move, transform)
+        self.entries[position_hash(key)] = x * self.size + y
+
+    def build(self, player, plies, radius=1, verbose=False):
+        """
+        Add the opening tree of `plies` plies for both sides, asking `player` for every book move.
+        """
+        for book_side in ('X', 'O'):
+            frontier = [[]]
+            for ply in range(plies):
+                children = {}
+                for history in frontier:
+                    game = self._replay(history)
+                    if game.current_player == book_side:
+                        state = game.get_game_state()
+                        move = self.lookup(state)
+                        if move is None:
+                            start = time.perf_counter()
+                            move = player.get_move(state)
+                            self.add(state, move)
+                            if verbose:
+                                print(f'{book_side} ply {ply}: {move} in {time.perf_counter() - start:.2f}s, {len(self)} entries')
+                        moves = [move]
+                    else:
+                        moves = self._replies(game, radius)
+                    for move in moves:
+                        child = self._replay(history + [move])
+                        if not child.game_over:
+                            # Equivalent positions are expanded once
+                            children.setdefault(self._canonical_key(child.get_snapshot())[0], history + [move])
+                frontier = list(children.values())
+
+    def store(self, file_path):
+        hashes = np.concatenate([np.asarray(self.hashes), np.fromiter(self.entries.keys(), dtype='<u8', count=len(self.entries))])
+        moves = np.concatenate([np.asarray(self.moves), np.fromiter(self.entries.values(), dtype='<u2', count=len(self.entries))])
+        hashes, first = np.unique(hashes[::-1], return_index=True)
+        # Newer entries win over the ones the book was loaded with
+        moves = moves[::-1][first]
+        entries = np.empty(len(hashes), dtype=ENTRY)
+        entries['hash'], entries['move'] = hashes, moves
+        header = HEADER.pack(MAGIC, VERSION, self.size, self.pieces_in_row_to_win, len(entries))
+        with open(file_path, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(entries.tobytes())
+
+    #---------| Private |---------#
+    def _canonical_key(self, snapshot):
+        cells, current_player = snapshot
+        return self.symmetry.canonicalize(cells.translate(SERIALIZE[current_player]).decode('ascii'))
+
+    def _replay(self, history):
+        game = Gomoku(size=self.size, pieces_in_row_to_win=self.pieces_in_row_to_win)
+        for x, y in history:
+            game.move(x, y)
+        return game
+
+    def _replies(self, game, radius):
+        return sorted(game.candidate_moves(radius))
+
+
+class BookPlayer(Player):
+    """
+    Plays the book move of a position when the book has one, and the wrapped player's move otherwise.
+    """
+
+    #-----------| Init |-----------#
+    def __init__(self, player, book):
+        super().__init__(player.name)
+        self.player = player
+        self.book = book
+        self.book_moves = 0
+
+    #----------| Public |----------#
+    def get_move(self, game_state):
+        move = self.book.lookup(game_state)
+        if move is not None:
+            self.book_moves += 1
+            return move
+        return self.player.get_move(game_state)
+
+    def score(self, score):
+        self.player.score(score)
+
+    def shutdown(self):
+        self.player.shutdown()
+
+
+if __name__ == '__main__':
+    # python OpeningBook.py build opening_book.bin --plies 4 --time-limit 1.0
+    # python OpeningBook.py show opening_book.bin
+    parser = argparse.ArgumentParser(description='Build or inspect an opening book.')
+    parser.add_argument('command', choices=['build', 'show'])
+    parser.add_argument('file_path')
+    parser.add_argument('--size', type=int, default=15)
+    parser.add_argument('--pieces-in-row-to-win', type=int, default=5)
+    parser.add_argument('--plies', type=int, default=4, help='Depth of the opening tree')
+    parser.add_argument('--radius', type=int, default=1, help='Replies followed around the stones')
+    parser.add_argument('--time-limit', type=float, default=1.0, help='Search seconds per book move')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from SearchPlayer import SearchPlayer
+        book = OpeningBook.load(args.file_path) if os.path.exists(args.file_path) else OpeningBook(args.size, args.pieces_in_row_to_win)
+        book.build(SearchPlayer('Book', pieces_in_row_to_win=book.pieces_in_row_to_win, time_limit=args.time_limit, seed=0), args.plies, args.radius, verbose=True)
+        book.store(args.file_path)
+        print(f'{len(book)} positions in {args.file_path}')
+    else:
+        book = OpeningBook.load(args.file_path)
+        print(f'{book.size}x{book.size}, {book.pieces_in_row_to_win} in a row, {len(book)} positions')
+        print(f'first move {book.lookup(Gomoku(size=book.size, pieces_in_row_to_win=book.pieces_in_row_to_win).get_game_state())}')
@@ -1,21 +1,29 @@
 from Player import Player
+from TicTacToeSolver import TicTacToeSolver
+import random
 
 """
 Implements the Newell and Simon strategy detailed in TicTacToe's Wikipedia page: https://en.wikipedia.org/wiki/Tic-tac-toe
 
 This player can be used to train and test the QTable Player. 
+
+With solved=True the player answers from the precomputed minimax table of TicTacToeSolver instead,
+picking at random among all optimal moves, and only falls back to the rules for positions outside it.
 """
 
 
 class PerfectPlayer(Player):
     
     #-----------| Init |-----------#
-    def __init__(self, name):
+    def __init__(self, name, solved=False):
         super().__init__(name)
+        self.solver = TicTacToeSolver.load() if solved else None
         
 
     #----------| Public |----------#
     def get_move(self,game_state):
+        if self.solver and game_state in self.solver:
+            return random.choice(self.solver.best_moves(game_state))
         board = game_state['board']
         current_player = game_state['current_player']
         #Win
@@ -42,9 +50,8 @@ class PerfectPlayer(Player):
             
             return move
 
-        available_moves = [(i, j) for i, row in enumerate(board) for j, spot in enumerate(row) if spot == ' ']
         #Play center
-        if (1,1) in available_moves:
+        if board[1][1] == ' ':
             
             return (1,1)
         #Play opposite corner
@@ -141,10 +148,9 @@ class PerfectPlayer(Player):
     
     def _get_opposite_corner(self, board, current_player):
         opponent = 'O' if current_player == 'X' else 'X'
-        available_moves = [(i, j) for i, row in enumerate(board) for j, spot in enumerate(row) if spot == ' ']
         for i in [0, 2]:
             for j in [0, 2]:
-                if board[i][j] == opponent and (2 - i, 2 - j) in available_moves:
+                if board[i][j] == opponent and board[2 - i][2 - j] == ' ':
                     return (2 - i, 2 - j)
         return False
     
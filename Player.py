@@ -1,4 +1,5 @@
 import pickle
+from collections import defaultdict
 
 class Player:
 
@@ -76,6 +77,7 @@ class HumanPlayer(Player):
 
 
 import random
+from gomoku import empty_cells_of
 
 class RandomPlayer(Player):
 
@@ -83,14 +85,8 @@ class RandomPlayer(Player):
         super().__init__(name)
 
     def get_move(self, game_state):
-        # Get the current board from the game state
-        board = game_state["board"]
-        
-        # Get the list of available moves (empty spots on the board)
-        available_moves = [(i, j) for i, row in enumerate(board) for j, spot in enumerate(row) if spot == ' ']
-
-        # Choose a random move from the list of available moves
-        move = random.choice(available_moves)
+        # Choose a random move from the empty cells the game keeps up to date
+        move = random.choice(empty_cells_of(game_state))
 
         return move
 
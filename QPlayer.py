@@ -1,118 +1,271 @@
-from Player import Player, RandomPlayer
-import os
+from Player import Player
+from gomoku import snapshot_of, peek_snapshot, empty_cells_of
 import random
-import copy
-import pandas as pd
+from QTable import QTable, MappedQTable
+import os
+from Symmetry import Symmetry
+from Exploration import Greedy
+from time import perf_counter
 
 LEARNING_RATE = 0.95
 DISCOUNT_FACTOR_GAMMA = 0.15
-CSV_COLUMNS = ["board",
-                    "mv_0_0",
-                    "mv_0_1",
-                    "mv_0_2",
-                    "mv_1_0",
-                    "mv_1_1",
-                    "mv_1_2",
-                    "mv_2_0",
-                    "mv_2_1",
-                    "mv_2_2"]
+# Byte translations from a snapshot's cells to the 'E'/'P'/'R' table key of the player to move
+SERIALIZE = {player: bytes.maketrans(b' ' + player.encode('ascii') + opponent.encode('ascii'), b'EPR') for player, opponent in [('X', 'O'), ('O', 'X')]}
+GREEDY = Greedy()
+
+
+#--------| Reward policies |---------#
+# The reward of a finished game from the player's score (1 win, 0.5 draw, 0 loss)
+def standard_reward(score):
+    return -10 if score == 0 else 10 if score == 1 else 5
+
+
+def aggressive_reward(score):
+    #Aggresive players feel bad when drawing
+    return 10 if score == 1 else -10
+
+
+REWARD_POLICIES = {'standard': standard_reward, 'aggressive': aggressive_reward}
+
 
 class QPlayer(Player):
-    
+    # Tables are stored as <TABLE_PREFIX><name>.csv or .qtb
+    TABLE_PREFIX = 'Qtable_'
+
     #-----------| Init |-----------#
-    def __init__(self, name):
+    def __init__(self, name, qtable=None, canonical=False, table_format='csv', size=3, replay=None, replay_batch=8, frozen=False,
+                 reward='standard', exploration=None, learning_rate=LEARNING_RATE, discount_factor_gamma=DISCOUNT_FACTOR_GAMMA):
         super().__init__(name)
-        self.QTable = self._init_table()
-        self.last_game_state = {}
+        # A name from REWARD_POLICIES, or any function of the final score
+        self.reward_policy = REWARD_POLICIES[reward] if isinstance(reward, str) else reward
+        # How a move is picked among the actions of a known state, see Exploration.py
+        self.exploration = exploration or Greedy()
+        self.learning_rate = learning_rate
+        self.discount_factor_gamma = discount_factor_gamma
+        # Board size the player is trained on; its actions are the size * size cells
+        self.size = size if qtable is None else qtable.size
+        # 'csv' stores the table in Qtable_<name>.csv, 'binary' in the compact Qtable_<name>.qtb
+        self.table_format = table_format
+        # A frozen player only plays: it never updates or stores its table, and maps the binary table
+        # read-only, so every process serving it shares one copy of it in the page cache
+        self.frozen = frozen
+        self.QTable = self._init_table() if qtable is None else qtable
+        # Learn one row per position up to rotations and reflections of the board
+        self.canonical = canonical
+        self.last_snapshot = None
         self.last_move = ()
+        self._last_key = (None, None)
+        # With a ReplayBuffer the player learns from whole episodes: each one is swept backwards when
+        # it ends, followed by `replay_batch` episodes sampled from the buffer
+        self.replay = replay
+        self.replay_batch = replay_batch
+        self.trajectory = []
+        # Seconds of the online update of the last get_move, only measured once a GameStats turns it
+        # on by setting it to a number
+        self.update_seconds = None
 
 
     #----------| Public |----------#
     def get_move(self,game_state):
         move = self._get_best_move(game_state)
-        
-        self._set_reward(game_state,move,0)
-        self.last_game_state = copy.deepcopy(game_state)
-        self.last_move = copy.deepcopy(move)
+        if self.frozen:
+            return move
+        if self.update_seconds is None:
+            self.observe(snapshot_of(game_state), move)
+        else:
+            start = perf_counter()
+            self.observe(snapshot_of(game_state), move)
+            self.update_seconds = perf_counter() - start
         return move
 
+    def observe(self, snapshot, move):
+        """
+        Learn from `move` played from `snapshot`, whether this player picked it or another player did,
+        as in a MultiQPlayer.
+        """
+        # Snapshots are immutable, so they can be kept without copying
+        if self._is_state_in_QTable(snapshot)==False:
+            self._generate_new_row(snapshot)
+        if self.replay is None:
+            self._set_reward(snapshot,move,0)
+        else:
+            self.trajectory.append((snapshot, move))
+        self.last_snapshot = snapshot
+        self.last_move = move
+
     def score(self, score):
-        reward = -10 if score == 0 else 10 if score == 1 else 5
-        self._set_reward(self.last_game_state,self.last_move,reward)
+        reward = self.reward_policy(score)
+        if self.frozen:
+            return
+        self.exploration.end_episode()
+        if self.replay is not None:
+            self._replay_episode(reward)
+        elif self.last_snapshot is not None:
+            self._set_reward(self.last_snapshot,self.last_move,reward)
 
     def shutdown(self):
-        self._store_table()
+        if not self.frozen:
+            self._store_table()
 
     #---------| Private |---------#
     def _get_best_move(self, game_state):
-        if self._is_state_in_QTable(game_state)==False:
-            return self._get_random_move(game_state)
+        snapshot = snapshot_of(game_state)
+        state, transform = self._state_key(snapshot)
+        moves = empty_cells_of(game_state)
+        if state not in self.QTable:
+            return self._get_random_move(snapshot, moves)
         else:
-            row = self.QTable.loc[self.QTable['board'] == self._serialize_board(game_state)]
-            valid_moves = self._valid_moves_as_columns(game_state)
-            max_value = row[valid_moves].max(axis=1).values[0]
-            mask = row == max_value
-            columns_with_max_value = row.loc[:, mask.values[0]].columns
-            column_with_best_move = random.choice(columns_with_max_value)
-            return self._column_header_as_move(column_with_best_move)
-        
-    def _get_random_move(self, game_state):
-        move = RandomPlayer('Temp').get_move(game_state)
-        if self._is_state_in_QTable(game_state)==False:
-            self._generate_new_row(game_state)
-        return move
+            valid_actions = self._valid_actions(snapshot, moves, transform)
+            values = self.QTable.get_values(state, valid_actions)
+            # Frozen players only play, so they never explore
+            exploration = GREEDY if self.frozen else self.exploration
+            best_action = valid_actions[exploration.select(values)]
+            return self._from_frame(snapshot, self._action_as_move(best_action), transform)
 
-    def _generate_new_row(self, game_state):
-        init_moves = {key: 0 for key in CSV_COLUMNS if key!='board'}
-        new_row = pd.DataFrame([{'board': self._serialize_board(game_state), **init_moves}])
-        self.QTable = pd.concat([self.QTable,new_row])
+    def _get_random_move(self, snapshot, moves):
+        return random.choice(moves)
+
+    def _generate_new_row(self, snapshot):
+        self.QTable.add_row(self._state_key(snapshot)[0])
     
-    def _set_reward(self, game_state, move, reward):
-        q_value = self._get_Qvalue(game_state,move)
-        updated_q_value = q_value + LEARNING_RATE *(reward + DISCOUNT_FACTOR_GAMMA * self._get_max_potential_reward(game_state,move) - q_value)
-        self.QTable.loc[self.QTable['board']==self._serialize_board(game_state),self._move_as_column_header(move)] = updated_q_value
+    def _set_reward(self, snapshot, move, reward):
+        state, transform = self._state_key(snapshot)
+        action = self._move_as_action(self._to_frame(snapshot, move, transform))
+        q_value = self.QTable.get_value(state,action)
+        updated_q_value = q_value + self.learning_rate *(reward + self.discount_factor_gamma * self._get_max_potential_reward(snapshot,move) - q_value)
+        self.QTable.set_value(state,action,updated_q_value)
+
+    def _replay_episode(self, reward):
+        episode = self.replay.add_episode(self.trajectory, reward)
+        error = self._sweep(self.trajectory, reward)
+        if episode is not None:
+            self.replay.update_priority(episode, error)
+        for sampled in self.replay.sample(self.replay_batch):
+            trajectory, sampled_reward = self.replay.trajectory(sampled)
+            self.replay.update_priority(sampled, self._sweep(trajectory, sampled_reward))
+        self.trajectory = []
 
-    def _get_Qvalue(self, game_state, move):
-        return self.QTable.loc[self.QTable['board']==self._serialize_board(game_state),self._move_as_column_header(move)]
+    def _sweep(self, trajectory, reward):
+        # Update the episode from its last move back to its first, so the final reward reaches every
+        # move in one pass. The successor of a move is the next position the player moved from.
+        # Returns the largest TD error of the sweep.
+        next_value, error = 0.0, 0.0
+        for index in range(len(trajectory) - 1, -1, -1):
+            snapshot, move = trajectory[index]
+            state, transform = self._state_key(snapshot)
+            action = self._move_as_action(self._to_frame(snapshot, move, transform))
+            target = reward if index == len(trajectory) - 1 else self.discount_factor_gamma * next_value
+            # Games read from a record file can reach states the table has never seen
+            q_value = self.QTable.get_value(state,action) if state in self.QTable else 0.0
+            self.QTable.set_value(state,action,q_value + self.learning_rate * (target - q_value))
+            error = max(error, abs(target - q_value))
+            next_value = self.QTable.max_value(state)
+        return error
+
+    def _get_Qvalue(self, snapshot, move):
+        state, transform = self._state_key(snapshot)
+        return self.QTable.get_value(state,self._move_as_action(self._to_frame(snapshot, move, transform)))
     
-    def _get_max_potential_reward(self,game_state,move):
-        new_game_state = copy.deepcopy(game_state)
-        new_game_state['board'][move[0]][move[1]] = game_state['current_player']
-        if self._is_state_in_QTable(new_game_state):
-            q_table_row = self.QTable.loc[self.QTable['board']==self._serialize_board(new_game_state)]
-            return q_table_row.iloc[:,1:].max().max()
+    def _get_max_potential_reward(self,snapshot,move):
+        # The successor is keyed from the same player's point of view, without copying the board
+        state = self._state_key(peek_snapshot(snapshot, *move))[0]
+        if state in self.QTable:
+            return self.QTable.max_value(state)
         else:
             return 0
 
     #-------| Persistence |--------#
     def _init_table(self):
-        file_path = f"./Qtable_{self.name}.csv"
-        if os.path.exists(file_path):
-            return pd.read_csv(file_path)
-        else:
-            return pd.DataFrame(columns=CSV_COLUMNS)
+        if self.frozen:
+            binary_path = f"./{self.TABLE_PREFIX}{self.name}.qtb"
+            csv_path = f"./{self.TABLE_PREFIX}{self.name}.csv"
+            # A CSV table retrained since the binary one was converted replaces it
+            stale = os.path.exists(binary_path) and os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(binary_path)
+            if not os.path.exists(binary_path) or stale:
+                # Convert the CSV table once; from then on startup only maps the binary file. Workers
+                # starting together may all convert it, so each writes its own file and renames it.
+                temporary_path = f"{binary_path}.{os.getpid()}"
+                QTable(self.size).load(csv_path).store_binary(temporary_path)
+                os.replace(temporary_path, binary_path)
+            return MappedQTable(binary_path, self.size)
+        if self.table_format == 'binary':
+            return QTable(self.size).load_binary(f"./{self.TABLE_PREFIX}{self.name}.qtb")
+        file_path = f"./{self.TABLE_PREFIX}{self.name}.csv"
+        return QTable(self.size).load(file_path)
 
     def _store_table(self):
-        file_path = f"./Qtable_{self.name}.csv"
-        self.QTable.fillna(0).to_csv(file_path,index=False)        
+        if self.table_format == 'binary':
+            self.QTable.store_binary(f"./{self.TABLE_PREFIX}{self.name}.qtb")
+            return
+        file_path = f"./{self.TABLE_PREFIX}{self.name}.csv"
+        self.QTable.store(file_path)        
     
     #---------| Utility |---------#
-    def _is_state_in_QTable(self,game_state):
-        return self.QTable['board'].eq(self._serialize_board(game_state)).any()
+    def _is_state_in_QTable(self,snapshot):
+        return self._state_key(snapshot)[0] in self.QTable
     
-    def _serialize_board(self, game_state):
-        return ''.join('E' if position == ' ' else 'P' if position==game_state['current_player'] else 'R' for row in game_state['board'] for position in row)
+    def _serialize_board(self, snapshot):
+        cells, current_player = snapshot
+        return cells.translate(SERIALIZE[current_player]).decode('ascii')
+
+    def _state_key(self, snapshot):
+        # Returns the Q-table key of the state and the symmetry that maps the board onto it.
+        # The last result is kept, since a move looks up the same snapshot several times.
+        if self._last_key[0] == snapshot:
+            return self._last_key[1]
+        state = self._serialize_board(snapshot)
+        key = (state, 0) if not self.canonical else Symmetry.for_size(self.size).canonicalize(state)
+        self._last_key = (snapshot, key)
+        return key
+
+    def _to_frame(self, snapshot, move, transform):
+        return Symmetry.for_size(self.size).to_frame(move, transform) if transform else move
+
+    def _from_frame(self, snapshot, move, transform):
+        return Symmetry.for_size(self.size).from_frame(move, transform) if transform else move
 
-    def _move_as_column_header(self, move):
-        return "mv_" + str(move[0]) + "_" + str(move[1])
+    def _move_as_action(self, move):
+        return move[0] * self.size + move[1]
     
-    def _column_header_as_move(self, column_header):
-        return tuple(map(int, column_header.split('_')[1:]))
-
-    def _valid_moves_as_columns(self, game_state):
-        board = game_state['board']
-        available_moves = [(i, j) for i, row in enumerate(board) for j, spot in enumerate(row) if spot == ' ']
-        columns_to_check=[]
-        for move in available_moves:
-            columns_to_check += [self._move_as_column_header(move)]
-        return columns_to_check
\ No newline at end of file
+    def _action_as_move(self, action):
+        return divmod(action, self.size)
+
+    def _valid_actions(self, snapshot, moves, transform=0):
+        if not transform:
+            return [self._move_as_action(move) for move in moves]
+        return [self._move_as_action(self._to_frame(snapshot, move, transform)) for move in moves]
+
+
+class MultiQPlayer(Player):
+    """
+    Trains several Q players on the same games: the first one picks every move, and each of them learns
+    from it with its own reward policy, table and settings. Q-learning does not need the moves to come
+    from the learning player's own policy, so one pass over the games trains every variant.
+    """
+
+    #-----------| Init |-----------#
+    def __init__(self, players, name=None):
+        super().__init__(name or players[0].name)
+        self.players = players
+        # As in QPlayer, the time of the updates of every variant
+        self.update_seconds = None
+
+    #----------| Public |----------#
+    def get_move(self, game_state):
+        move = self.players[0]._get_best_move(game_state)
+        snapshot = snapshot_of(game_state)
+        start = perf_counter() if self.update_seconds is not None else None
+        for player in self.players:
+            if not player.frozen:
+                player.observe(snapshot, move)
+        if start is not None:
+            self.update_seconds = perf_counter() - start
+        return move
+
+    def score(self, score):
+        for player in self.players:
+            player.score(score)
+
+    def shutdown(self):
+        for player in self.players:
+            player.shutdown()
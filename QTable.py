@@ -0,0 +1,213 @@
+import os
+import struct
+import sys
+import numpy as np
+
+"""
+Q-table storage for the Q-learning players.
+
+States are kept in a dict keyed by the serialized board, so looking up, adding
+and updating a state is O(1) instead of a scan over a DataFrame. Actions are the
+integer cell indices x * size + y of a size x size board, and each state only
+stores the actions that were actually updated; every other action is worth 0.
+The CSV layout of `Qtable_<name>.csv` (a "board" column followed by one mv_x_y
+column per cell) is kept for load and save.
+
+Tables can also be stored in a compact binary file (`.qtb`): a fixed header, the
+state keys sorted as fixed-width ASCII strings, then a float32 matrix with one
+row per state and one column per action. MappedQTable opens such a file through
+numpy.memmap, so several processes can share one read-only copy of the table.
+"""
+
+# magic, version, board size, action count, key width, number of states
+HEADER = struct.Struct('<4sIIIIQ')
+HEADER_SIZE = 32
+MAGIC = b'QTBL'
+VERSION = 1
+
+
+def csv_columns(size):
+    return ['board'] + [f'mv_{x}_{y}' for x in range(size) for y in range(size)]
+
+
+class QTable:
+
+    #-----------| Init |-----------#
+    def __init__(self, size=3):
+        self.size = size
+        self.action_count = size * size
+        self.columns = csv_columns(size)
+        self.rows = {}
+
+    #----------| Public |----------#
+    def __contains__(self, state):
+        return state in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_row(self, state):
+        return self.rows[state]
+
+    def add_row(self, state):
+        if state not in self.rows:
+            self.rows[state] = {}
+        return self.rows[state]
+
+    def get_value(self, state, action):
+        return self.rows[state].get(action, 0.0)
+
+    def get_values(self, state, actions):
+        row = self.rows[state]
+        return [row.get(action, 0.0) for action in actions]
+
+    def set_value(self, state, action, value):
+        self.add_row(state)[action] = value
+
+    def max_value(self, state):
+        row = self.rows[state]
+        best = max(row.values(), default=0.0)
+        # Actions that were never updated are worth 0
+        return best if len(row) == self.action_count else max(best, 0.0)
+
+    #-------| Persistence |--------#
+    def load(self, file_path):
+        if not os.path.exists(file_path):
+            return self
+        # pandas is slow to import, so only CSV tables pay for it
+        import pandas as pd
+        data = pd.read_csv(file_path, dtype={'board': str}).fillna(0)
+        if list(data.columns) != self.columns:
+            raise ValueError(f'{file_path} does not hold a {self.size}x{self.size} Q-table')
+        self._add_dense_rows(data['board'], data[self.columns[1:]].to_numpy(dtype=np.float64))
+        return self
+
+    def store(self, file_path):
+        import pandas as pd
+        states, values = self._dense_rows(np.float64)
+        data = pd.DataFrame(values, columns=self.columns[1:])
+        data.insert(0, 'board', states)
+        data.to_csv(file_path, index=False)
+
+    def load_binary(self, file_path):
+        """
+        Read a binary table into memory, e.g. to keep training it.
+        """
+        if not os.path.exists(file_path):
+            return self
+        mapped = MappedQTable(file_path, self.size)
+        self._add_dense_rows([key.decode('ascii') for key in mapped.keys], mapped.values)
+        return self
+
+    def store_binary(self, file_path):
+        states, values = self._dense_rows(np.float32)
+        key_width = len(states[0]) if states else self.action_count
+        keys = np.array([state.encode('ascii') for state in states], dtype=f'S{key_width}')
+        header = HEADER.pack(MAGIC, VERSION, self.size, self.action_count, key_width, len(states))
+        with open(file_path, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(keys.tobytes())
+            f.write(b'\0' * (_values_offset(key_width, len(states)) - HEADER_SIZE - keys.nbytes))
+            f.write(values.tobytes())
+
+    #---------| Private |---------#
+    def _dense_rows(self, dtype):
+        states = sorted(self.rows)
+        values = np.zeros((len(states), self.action_count), dtype=dtype)
+        for index, state in enumerate(states):
+            for action, value in self.rows[state].items():
+                values[index, action] = value
+        return states, values
+
+    def _add_dense_rows(self, states, values):
+        for state, row in zip(states, values):
+            actions = np.flatnonzero(row)
+            self.rows[state] = dict(zip(actions.tolist(), row[actions].tolist()))
+
+
+class MappedQTable(QTable):
+    """
+    Read-only view of a binary Q-table file. Keys and values stay in the page cache and are shared by
+    every process that maps the same file; a state is found by binary search over the sorted keys.
+    """
+
+    #-----------| Init |-----------#
+    def __init__(self, file_path, size=None):
+        with open(file_path, 'rb') as f:
+            magic, version, board_size, action_count, key_width, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file_path} is not a binary Q-table')
+        if size is not None and size != board_size:
+            raise ValueError(f'{file_path} holds a {board_size}x{board_size} Q-table, expected {size}x{size}')
+        super().__init__(board_size)
+        self.file_path = file_path
+        self.count = count
+        if count:
+            self.keys = np.memmap(file_path, dtype=f'S{key_width}', mode='r', offset=HEADER_SIZE, shape=(count,))
+            self.values = np.memmap(file_path, dtype=np.float32, mode='r', offset=_values_offset(key_width, count), shape=(count, action_count))
+        else:
+            self.keys = np.empty(0, dtype=f'S{key_width}')
+            self.values = np.empty((0, action_count), dtype=np.float32)
+
+    #----------| Public |----------#
+    def __contains__(self, state):
+        return self._find(state) is not None
+
+    def __len__(self):
+        return self.count
+
+    def get_row(self, state):
+        return self.values[self._find(state)]
+
+    def add_row(self, state):
+        raise TypeError('MappedQTable is read-only')
+
+    def get_value(self, state, action):
+        return float(self.values[self._find(state), action])
+
+    def get_values(self, state, actions):
+        return self.values[self._find(state), list(actions)].tolist()
+
+    def set_value(self, state, action, value):
+        raise TypeError('MappedQTable is read-only')
+
+    def max_value(self, state):
+        return float(self.values[self._find(state)].max())
+
+    def store(self, file_path):
+        QTable(self.size).load_binary(self.file_path).store(file_path)
+
+    #---------| Private |---------#
+    def _find(self, state):
+        key = state.encode('ascii')
+        index = int(np.searchsorted(self.keys, key))
+        if index < self.count and self.keys[index] == key:
+            return index
+        return None
+
+
+#---------| Utility |---------#
+def _values_offset(key_width, count):
+    # The float32 matrix starts at the first 4-byte boundary after the keys
+    end_of_keys = HEADER_SIZE + key_width * count
+    return (end_of_keys + 3) // 4 * 4
+
+
+def csv_to_binary(size, csv_path, binary_path):
+    QTable(size).load(csv_path).store_binary(binary_path)
+
+
+def binary_to_csv(binary_path, csv_path):
+    MappedQTable(binary_path).store(csv_path)
+
+
+if __name__ == '__main__':
+    # python QTable.py to-binary Qtable_Trained.csv Qtable_Trained.qtb [size]
+    # python QTable.py to-csv Qtable_Trained.qtb Qtable_Trained.csv
+    command, source, target = sys.argv[1:4]
+    if command == 'to-binary':
+        csv_to_binary(int(sys.argv[4]) if len(sys.argv) > 4 else 3, source, target)
+    elif command == 'to-csv':
+        binary_to_csv(source, target)
+    else:
+        sys.exit(f'Unknown command {command}, use to-binary or to-csv')
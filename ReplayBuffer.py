@@ -0,0 +1,92 @@
+from collections import deque
+import numpy as np
+
+"""
+Experience replay for the Q-learning players.
+
+Every move of an episode is written into fixed-size ring arrays: the board cells of the snapshot the
+player moved from, the side to move and the action. An episode is a run of consecutive slots plus its
+final reward and a sampling priority; once the ring wraps around, episodes whose first slot has been
+overwritten are dropped.
+
+Episodes are sampled uniformly, or with prioritized=True in proportion to priority ** alpha, where the
+priority is the largest TD error seen in the last sweep over the episode.
+"""
+
+MIN_PRIORITY = 1e-3
+
+
+class ReplayBuffer:
+
+    #-----------| Init |-----------#
+    def __init__(self, capacity=100000, size=3, prioritized=False, alpha=0.6, seed=None):
+        self.capacity = capacity
+        self.size = size
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.rng = np.random.default_rng(seed)
+        self.cells = np.zeros((capacity, size * size), dtype=np.uint8)
+        self.players = np.zeros(capacity, dtype=np.uint8)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        # Absolute number of moves ever written; slot = position % capacity
+        self.written = 0
+        # [first position, length, reward, priority] of every episode still in the ring
+        self.episodes = deque()
+        self.max_priority = 1.0
+
+    #----------| Public |----------#
+    def __len__(self):
+        return len(self.episodes)
+
+    def add_episode(self, trajectory, reward):
+        """
+        Store the (snapshot, move) pairs of one episode and its final reward.
+
+        Returns:
+        The episode record, or None when the episode does not fit in the buffer.
+        """
+        length = len(trajectory)
+        if length == 0 or length > self.capacity:
+            return None
+        for offset, ((cells, current_player), (x, y)) in enumerate(trajectory):
+            slot = (self.written + offset) % self.capacity
+            self.cells[slot] = np.frombuffer(cells, dtype=np.uint8)
+            self.players[slot] = ord(current_player)
+            self.actions[slot] = x * self.size + y
+        # New episodes get the highest priority, so they are replayed at least once soon
+        episode = [self.written, length, reward, self.max_priority]
+        self.written += length
+        while self.episodes and self.episodes[0][0] < self.written - self.capacity:
+            self.episodes.popleft()
+        self.episodes.append(episode)
+        return episode
+
+    def sample(self, count):
+        """
+        Sample up to `count` distinct episodes.
+        """
+        count = min(count, len(self.episodes))
+        if count == 0:
+            return []
+        probabilities = None
+        if self.prioritized:
+            priorities = np.array([episode[3] for episode in self.episodes]) ** self.alpha
+            probabilities = priorities / priorities.sum()
+        indices = self.rng.choice(len(self.episodes), size=count, replace=False, p=probabilities)
+        return [self.episodes[index] for index in indices]
+
+    def trajectory(self, episode):
+        """
+        Rebuild the (snapshot, move) pairs and the final reward of a stored episode.
+        """
+        start, length, reward, _ = episode
+        trajectory = []
+        for position in range(start, start + length):
+            slot = position % self.capacity
+            snapshot = (self.cells[slot].tobytes(), chr(self.players[slot]))
+            trajectory.append((snapshot, divmod(int(self.actions[slot]), self.size)))
+        return trajectory, reward
+
+    def update_priority(self, episode, error):
+        episode[3] = abs(error) + MIN_PRIORITY
+        self.max_priority = max(self.max_priority, episode[3])
@@ -0,0 +1,267 @@
+from Player import Player
+from BitboardGomoku import BitboardGomoku
+import random
+import time
+
+"""
+Alpha-beta search player for any board size and line length.
+
+Searches a BitboardGomoku copy of the game with iterative-deepening negamax. Positions are cached in a
+transposition table keyed by a Zobrist hash, only empty cells near existing stones are searched, and
+moves are ordered by the transposition table move, two killer moves per ply and the history heuristic.
+Each move gets `time_limit` seconds; the result of the deepest completed iteration is played.
+
+The evaluation counts, for every window of `pieces_in_row_to_win` cells, the stones of a player that has
+the window to itself. It is updated incrementally from the windows through the moved cell.
+"""
+
+WIN = 1000000
+INFINITY = WIN + 1
+# Values past this bound are wins, WIN minus the number of plies to the winning move
+WIN_BOUND = WIN // 2
+EXACT, LOWER, UPPER = 0, 1, 2
+MAX_TABLE_SIZE = 1000000
+_windows_cache = {}
+
+
+class _Timeout(Exception):
+    pass
+
+
+class SearchPlayer(Player):
+
+    #-----------| Init |-----------#
+    def __init__(self, name, pieces_in_row_to_win=5, time_limit=1.0, max_depth=32, radius=1, verbose=False, seed=None):
+        super().__init__(name)
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.radius = radius
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.transposition_table = {}
+        self.zobrist = {}
+        self.zobrist_side = self.rng.getrandbits(64)
+        self.history = {}
+        self.total_nodes = 0
+        self.total_time = 0.0
+        self.last_search = {}
+
+    #----------| Public |----------#
+    def get_move(self, game_state):
+        board = game_state['board']
+        self.game = BitboardGomoku(size=len(board), pieces_in_row_to_win=self.pieces_in_row_to_win,
+                                   starting_board=[row[:] for row in board], next_player=game_state['current_player'])
+        self._init_search()
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+
+        moves = self._candidate_moves()
+        best_move, best_value, depth_reached = moves[0], 0, 0
+        try:
+            for depth in range(1, self.max_depth + 1):
+                best_value, best_move = self._search_root(depth, moves, best_move)
+                depth_reached = depth
+                if abs(best_value) >= WIN - self.max_depth or time.perf_counter() > start + self.time_limit / 2:
+                    break
+        except _Timeout:
+            pass
+
+        elapsed = time.perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_time += elapsed
+        self.last_search = {
+            'depth': depth_reached,
+            'nodes': self.nodes,
+            'seconds': elapsed,
+            'nps': self.nodes / elapsed if elapsed else 0.0,
+            'value': best_value
+        }
+        if self.verbose:
+            print(f"{self.name}: depth {depth_reached}, {self.nodes} nodes, {self.last_search['nps']:.0f} nodes/s, value {best_value}")
+        if len(self.transposition_table) > MAX_TABLE_SIZE:
+            self.transposition_table.clear()
+        return self.game.coords(best_move)
+
+    def nodes_per_second(self):
+        return self.total_nodes / self.total_time if self.total_time else 0.0
+
+    def score(self, score):
+        pass
+
+    def shutdown(self):
+        if self.verbose:
+            print(f"{self.name}: {self.total_nodes} nodes in {self.total_time:.2f}s ({self.nodes_per_second():.0f} nodes/s)")
+
+    #---------| Search |----------#
+    def _search_root(self, depth, moves, previous_best):
+        # Search the previous iteration's best move first
+        moves = [previous_best] + [move for move in moves if move != previous_best]
+        alpha, best_value, best_move = -INFINITY, -INFINITY, previous_best
+        for move in moves:
+            value = self._score_move(move, depth, -INFINITY, -alpha, 0)
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+        return best_value, best_move
+
+    def _score_move(self, move, depth, alpha, beta, ply):
+        # Value of `move` for the player making it; alpha/beta are from the opponent's point of view
+        won = self._make(move)
+        try:
+            if won:
+                return WIN - ply
+            if self.game.game_over:
+                return 0
+            return -self._negamax(depth - 1, alpha, beta, ply + 1)
+        finally:
+            self._unmake(move)
+
+    def _negamax(self, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        alpha_original = alpha
+        entry = self.transposition_table.get(self.hash)
+        table_move = None
+        if entry:
+            entry_depth, entry_value, entry_flag, table_move = entry
+            entry_value = _value_from_table(entry_value, ply)
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_value
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_value
+
+        if depth == 0:
+            return self._evaluate()
+
+        best_value, best_move = -INFINITY, None
+        for move in self._ordered_moves(ply, table_move):
+            value = self._score_move(move, depth, -beta, -alpha, ply)
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self._store_killer(ply, move)
+                self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+        if best_move is None:
+            return 0
+
+        flag = UPPER if best_value <= alpha_original else LOWER if best_value >= beta else EXACT
+        self.transposition_table[self.hash] = (depth, _value_to_table(best_value, ply), flag, best_move)
+        return best_value
+
+    def _ordered_moves(self, ply, table_move):
+        moves = self._candidate_moves()
+        killers = self.killers.get(ply, ())
+        moves.sort(key=lambda move: (move == table_move, move in killers, self.history.get(move, 0)), reverse=True)
+        return moves
+
+    def _store_killer(self, ply, move):
+        killers = self.killers.get(ply, [])
+        if move not in killers:
+            self.killers[ply] = [move] + killers[:1]
+
+    #--------| Board state |-------#
+    def _init_search(self):
+        game = self.game
+        if game.size not in self.zobrist:
+            self.zobrist[game.size] = {player: [self.rng.getrandbits(64) for _ in range(game.size * game.width)] for player in game.players}
+        self.keys = self.zobrist[game.size]
+        self.windows = _windows(game.size, game.width, self.pieces_in_row_to_win)
+        self.killers = {}
+        self.hash = 0 if game.current_player == game.players[0] else self.zobrist_side
+        self.score_x = 0
+        for player in game.players:
+            mask = game.masks[player]
+            while mask:
+                low_bit = mask & -mask
+                self.hash ^= self.keys[player][low_bit.bit_length() - 1]
+                mask ^= low_bit
+        for window in set(w for windows in self.windows.values() for w in windows):
+            self.score_x += self._window_score(window)
+
+    def _make(self, move):
+        player = self.game.current_player
+        before = sum(self._window_score(window) for window in self.windows[move])
+        won = self.game.make_move(move)
+        self.score_x += sum(self._window_score(window) for window in self.windows[move]) - before
+        self.hash ^= self.keys[player][move] ^ self.zobrist_side
+        return won
+
+    def _unmake(self, move):
+        after = sum(self._window_score(window) for window in self.windows[move])
+        self.game.unmake_move()
+        player = self.game.current_player
+        self.score_x += sum(self._window_score(window) for window in self.windows[move]) - after
+        self.hash ^= self.keys[player][move] ^ self.zobrist_side
+
+    def _window_score(self, window):
+        x_stones = (self.game.masks['X'] & window).bit_count()
+        o_stones = (self.game.masks['O'] & window).bit_count()
+        if x_stones and o_stones:
+            return 0
+        if x_stones:
+            return 4 ** x_stones
+        if o_stones:
+            return -(4 ** o_stones)
+        return 0
+
+    def _evaluate(self):
+        return self.score_x if self.game.current_player == 'X' else -self.score_x
+
+    def _candidate_moves(self):
+        return self.game.candidate_indices(self.radius)
+
+
+#---------| Private |---------#
+def _value_to_table(value, ply):
+    """
+    Make a win value relative to the stored position: the same position reached at another ply is
+    the same number of plies away from the win, not from the root.
+    """
+    if value >= WIN_BOUND:
+        return value + ply
+    if value <= -WIN_BOUND:
+        return value - ply
+    return value
+
+
+def _value_from_table(value, ply):
+    """
+    Turn a stored win value back into a value relative to the root of the current search.
+    """
+    if value >= WIN_BOUND:
+        return value - ply
+    if value <= -WIN_BOUND:
+        return value + ply
+    return value
+
+
+def _windows(size, width, length):
+    """
+    Return, for every cell index, the masks of all windows of `length` cells in a line that contain it.
+    """
+    key = (size, length)
+    if key not in _windows_cache:
+        by_cell = {x * width + y: [] for x in range(size) for y in range(size)}
+        for x in range(size):
+            for y in range(size):
+                for dx, dy in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_x, end_y = x + dx * (length - 1), y + dy * (length - 1)
+                    if not (0 <= end_x < size and 0 <= end_y < size):
+                        continue
+                    cells = [(x + dx * i) * width + (y + dy * i) for i in range(length)]
+                    window = sum(1 << cell for cell in cells)
+                    for cell in cells:
+                        by_cell[cell].append(window)
+        _windows_cache[key] = by_cell
+    return _windows_cache[key]
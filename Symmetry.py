@@ -0,0 +1,61 @@
+"""
+Symmetries of a square board, used to canonicalize Q-table states.
+
+A square board has 8 symmetries (4 rotations, each optionally mirrored). Every serialized board is
+mapped to the smallest of its 8 transformed keys, so all equivalent positions share one Q-table row.
+Moves are transformed into that canonical frame before they are looked up, and back out of it before
+they are played.
+"""
+
+_cache = {}
+
+
+def _transform(x, y, size, transform):
+    # Transforms 0-3 rotate by 0, 90, 180 and 270 degrees, 4-7 do the same after a mirror
+    if transform >= 4:
+        y = size - 1 - y
+    for _ in range(transform % 4):
+        x, y = y, size - 1 - x
+    return x, y
+
+
+class Symmetry:
+
+    #-----------| Init |-----------#
+    def __init__(self, size):
+        self.size = size
+        cells = [(x, y) for x in range(size) for y in range(size)]
+        # forward[t][(x, y)] is where (x, y) lands after transform t, inverse[t] undoes it
+        self.forward = [{cell: _transform(*cell, size, t) for cell in cells} for t in range(8)]
+        self.inverse = [{target: cell for cell, target in forward.items()} for forward in self.forward]
+        # permutations[t][i] is the index of the original cell that ends up at flat index i
+        self.permutations = [[self._flat(self.inverse[t][cell]) for cell in cells] for t in range(8)]
+
+    @classmethod
+    def for_size(cls, size):
+        if size not in _cache:
+            _cache[size] = cls(size)
+        return _cache[size]
+
+    #----------| Public |----------#
+    def canonicalize(self, key):
+        """
+        Return (canonical key, transform) for a row-major serialized board, where the canonical key is the
+        smallest of the 8 transformed keys and transform is the one that produces it.
+        """
+        best_key, best_transform = key, 0
+        for transform in range(1, 8):
+            candidate = ''.join([key[i] for i in self.permutations[transform]])
+            if candidate < best_key:
+                best_key, best_transform = candidate, transform
+        return best_key, best_transform
+
+    def to_frame(self, move, transform):
+        return self.forward[transform][tuple(move)]
+
+    def from_frame(self, move, transform):
+        return self.inverse[transform][tuple(move)]
+
+    #---------| Private |---------#
+    def _flat(self, cell):
+        return cell[0] * self.size + cell[1]
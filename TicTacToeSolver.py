@@ -0,0 +1,135 @@
+import os
+import pickle
+
+"""
+Solves 3x3 tic-tac-toe once with minimax and keeps the result as a lookup table.
+
+Every position reachable from the empty board with 'X' to move (5478 of them) is stored under a
+10-character key: the 9 cells in row-major order followed by the player to move. Each entry holds the
+game-theoretic value for the player to move (1 win, 0 draw, -1 loss) and all of its optimal moves as
+flat cell indices. The table is pickled to disk the first time it is built.
+"""
+
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8),
+         (0, 3, 6), (1, 4, 7), (2, 5, 8),
+         (0, 4, 8), (2, 4, 6)]
+SOLUTION_FILE = "./TicTacToe_solution.pkl"
+
+
+class TicTacToeSolver:
+
+    #-----------| Init |-----------#
+    def __init__(self, table):
+        # table maps a key to (value, optimal moves)
+        self.table = table
+
+    @classmethod
+    def load(cls, file_path=SOLUTION_FILE):
+        """
+        Load the solved table from `file_path`, solving and storing it first if the file does not exist.
+        """
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                return cls(pickle.load(f))
+        solver = cls.solve()
+        with open(file_path, 'wb') as f:
+            pickle.dump(solver.table, f)
+        return solver
+
+    @classmethod
+    def solve(cls):
+        table = {}
+        _minimax(' ' * 9, 'X', table)
+        return cls(table)
+
+    #----------| Public |----------#
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, game_state):
+        return self.key(game_state) in self.table
+
+    def best_moves(self, game_state):
+        """
+        Return all optimal moves of the player to move as (x, y) tuples.
+        """
+        return [divmod(move, 3) for move in self.table[self.key(game_state)][1]]
+
+    def value(self, game_state):
+        """
+        Return the game-theoretic value of the state for the player to move: 1 win, 0 draw, -1 loss.
+        """
+        return self.table[self.key(game_state)][0]
+
+    def move_values(self, game_state):
+        """
+        Return the value of every legal move for the player who makes it, as a dict of (x, y) to value.
+        """
+        key = self.key(game_state)
+        cells, player = key[:9], key[9]
+        opponent = 'O' if player == 'X' else 'X'
+        values = {}
+        for move in range(9):
+            if cells[move] == ' ':
+                child = cells[:move] + player + cells[move + 1:]
+                values[divmod(move, 3)] = -self.table[child + opponent][0]
+        return values
+
+    def evaluate_policy(self, policy, player='X'):
+        """
+        Score a policy (any callable taking a game state and returning a move, e.g. a QPlayer's
+        `_get_best_move`) on every non-terminal position where `player` is to move.
+
+        Returns:
+        (fraction of positions where the policy plays an optimal move, number of positions where its move
+        lowers the game-theoretic value).
+        """
+        optimal, blunders, positions = 0, 0, 0
+        for key, (value, moves) in self.table.items():
+            if key[9] != player or not moves:
+                continue
+            game_state = {
+                "board": [list(key[row * 3:row * 3 + 3]) for row in range(3)],
+                "current_player": player,
+                "game_over": False,
+                "winner": None
+            }
+            x, y = policy(game_state)
+            positions += 1
+            if x * 3 + y in moves:
+                optimal += 1
+            elif self.move_values(game_state).get((x, y), -2) < value:
+                blunders += 1
+        return optimal / positions, blunders
+
+    def key(self, game_state):
+        return ''.join(position for row in game_state['board'] for position in row) + game_state['current_player']
+
+
+#---------| Private |---------#
+def _is_win(cells, player):
+    return any(cells[a] == cells[b] == cells[c] == player for a, b, c in LINES)
+
+
+def _minimax(cells, player, table):
+    key = cells + player
+    if key in table:
+        return table[key][0]
+    opponent = 'O' if player == 'X' else 'X'
+    if _is_win(cells, opponent):
+        table[key] = (-1, ())
+        return -1
+    if ' ' not in cells:
+        table[key] = (0, ())
+        return 0
+    best_value, best_moves = -2, []
+    for move in range(9):
+        if cells[move] != ' ':
+            continue
+        value = -_minimax(cells[:move] + player + cells[move + 1:], opponent, table)
+        if value > best_value:
+            best_value, best_moves = value, [move]
+        elif value == best_value:
+            best_moves.append(move)
+    table[key] = (best_value, tuple(best_moves))
+    return best_value
@@ -0,0 +1,327 @@
+from gomoku import Gomoku, copy_game_state
+from GomokuGame import GomokuGame
+from Player import RandomPlayer
+from PerfectPlayer import PerfectPlayer
+from QPlayer import QPlayer
+from QPlayerAggressive import QPlayerAggressive
+from QTable import QTable
+from Exploration import EpsilonGreedy
+from threats import score_cells
+import numpy as np
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+"""
+Reproducible benchmarks of the engine, the players and training.
+
+    engine      Gomoku.move and Gomoku._check_winner throughput on 3x3 and 15x15 random games
+    latency     get_move latency percentiles of the Random, Perfect, Q and aggressive Q players, the
+                Q players frozen (so timing them does not change their table) with tables of several
+                sizes, filled with the positions reached in random self-play
+    training    episodes per second of a fresh QPlayer learning against the PerfectPlayer
+    threats     15x15 boards per second scored by threats.score_cells in batches
+    imports     startup time of a fresh interpreter importing the core, the entry points and a quick
+                RandomPlayer vs PerfectPlayer game, beyond the bare interpreter, and whether they load pandas
+
+Every benchmark is seeded, so two runs play the same games, and is repeated --repeat times. Throughput
+and startup metrics keep the fastest run, which filters out most of the scheduling noise; latency
+percentiles keep the median run, since the fastest run's tail is mostly luck. Results are written as
+JSON; with --baseline the run is compared against a stored result and any metric that got worse by
+more than its tolerance is reported as a regression (the exit status is then 1).
+
+Expected noise between two runs on an unchanged tree: about 5% on throughput (engine, training,
+threats) on an idle dedicated machine, but 20-40% on a shared VM, where the CPU time a run gets
+varies; --tolerance (25%) covers the first case only, so calibrate it on shared machines by comparing
+two runs of the unchanged tree. Latency percentiles of a few microseconds and interpreter startup move
+by 20-100% anywhere, as one context switch is a large fraction of the value. Those use
+--latency-tolerance (50%), and only count as regressions when they also got worse by more than an
+absolute amount (LATENCY_MIN_DELTA_US, IMPORT_MIN_DELTA_MS).
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+"""
+
+# 3x3 games reach 4520 positions with a move to play, so larger tables cannot come from real games
+TABLE_SIZES = [0, 1000, 4000]
+# Smallest slowdowns of the noisy metrics that can count as regressions
+LATENCY_MIN_DELTA_US = 2.0
+IMPORT_MIN_DELTA_MS = 20.0
+# Metric name prefixes compared with --latency-tolerance instead of --tolerance
+NOISY_METRICS = ('latency/', 'imports/')
+
+
+def metric(value, unit, higher_is_better, min_delta=0.0):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better, 'min_delta': min_delta}
+
+
+def random_games(count, size, pieces_in_row_to_win, seed):
+    """
+    Move lists of `count` seeded random games, each played to the end.
+    """
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Gomoku(size=size, pieces_in_row_to_win=pieces_in_row_to_win)
+        cells = [(x, y) for x in range(size) for y in range(size)]
+        rng.shuffle(cells)
+        for x, y in cells:
+            game.move(x, y)
+            if game.game_over:
+                break
+        games.append(game.history)
+    return games
+
+
+#-----------| Engine |---------#
+def bench_engine(size, pieces_in_row_to_win, games, seed, repeat):
+    move_lists = random_games(games, size, pieces_in_row_to_win, seed)
+    moves = sum(len(move_list) for move_list in move_lists)
+
+    move_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for move_list in move_lists:
+            game = Gomoku(size=size, pieces_in_row_to_win=pieces_in_row_to_win)
+            for x, y in move_list:
+                game.move(x, y)
+        move_seconds.append(time.perf_counter() - start)
+
+    # Check the lines through every stone of the side that moved last, on each final position
+    finals = []
+    for move_list in move_lists:
+        game = Gomoku(size=size, pieces_in_row_to_win=pieces_in_row_to_win)
+        for x, y in move_list:
+            game.move(x, y)
+        finals.append((game, move_list[len(move_list) - 1::-2]))
+    checks = sum(len(stones) for _, stones in finals)
+
+    check_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for game, stones in finals:
+            for x, y in stones:
+                game._check_winner(x, y)
+        check_seconds.append(time.perf_counter() - start)
+
+    name = f'engine/{size}x{size}'
+    return {
+        f'{name}/moves_per_second': metric(moves / min(move_seconds), 'moves/s', True),
+        f'{name}/check_winner_per_second': metric(checks / min(check_seconds), 'calls/s', True)
+    }
+
+
+#----------| Latency |---------#
+def positions(count, seed):
+    """
+    Game states of 3x3 random games, taken before every move.
+    """
+    states = []
+    for move_list in random_games(count, 3, 3, seed):
+        game = Gomoku(size=3, pieces_in_row_to_win=3)
+        for x, y in move_list:
+            # The state shares the board with the game, so keep a copy of it
+            states.append(copy_game_state(game.get_game_state()))
+            game.move(x, y)
+    return states
+
+
+def filled_table(rows, seed):
+    # At least `rows` positions reached by two Q players exploring at random against each other on one
+    # table, with the values they learned there, standing in for a table trained that far
+    random.seed(seed)
+    table = QTable(3)
+    players = [QPlayer(name, qtable=table, exploration=EpsilonGreedy(1.0, 1.0, 1)) for name in ('Benchmark X', 'Benchmark O')]
+    logger = logging.getLogger('gomoku_benchmark_logger')
+    while len(table) < rows:
+        GomokuGame(*players, size=3, pieces_in_row_to_win=3, logger=logger).run_game()
+    return table
+
+
+def percentiles(samples, unit_scale=1e6):
+    samples = sorted(samples)
+    at = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * unit_scale
+    return {'p50': at(0.50), 'p90': at(0.90), 'p99': at(0.99)}
+
+
+def bench_latency(name, make_player, states, seed, repeat):
+    runs = []
+    for _ in range(repeat):
+        random.seed(seed)
+        player = make_player()
+        samples = []
+        for state in states:
+            start = time.perf_counter()
+            player.get_move(state)
+            samples.append(time.perf_counter() - start)
+        runs.append(percentiles(samples))
+    # The median run of every percentile
+    return {f'latency/{name}/{q}_us': metric(statistics.median(run[q] for run in runs), 'us', False, LATENCY_MIN_DELTA_US) for q in runs[0]}
+
+
+def bench_players(games, seed, repeat):
+    states = positions(games, seed)
+    results = {}
+    results.update(bench_latency('random', lambda: RandomPlayer('Random'), states, seed, repeat))
+    results.update(bench_latency('perfect', lambda: PerfectPlayer('Perfect'), states, seed, repeat))
+    for rows in TABLE_SIZES:
+        # Tables are passed in, so the players never read or write a Qtable_*.csv file, and frozen players
+        # never change them, so every run times the same table
+        table = filled_table(rows, seed)
+        results.update(bench_latency(f'qplayer_{rows}_rows', lambda: QPlayer('Benchmark', qtable=table, frozen=True), states, seed, repeat))
+        results.update(bench_latency(f'aggressive_{rows}_rows', lambda: QPlayerAggressive('Benchmark', qtable=table, frozen=True), states, seed, repeat))
+    return results
+
+
+#----------| Training |--------#
+def bench_training(episodes, seed, repeat):
+    logger = logging.getLogger('gomoku_benchmark_logger')
+    elapsed = []
+    for _ in range(repeat):
+        random.seed(seed)
+        player1 = QPlayer('Benchmark', qtable=QTable(3))
+        player2 = PerfectPlayer('Perfect')
+        start = time.perf_counter()
+        for _ in range(episodes):
+            GomokuGame(player1, player2, size=3, pieces_in_row_to_win=3, logger=logger).run_game()
+        elapsed.append(time.perf_counter() - start)
+    return {
+        'training/3x3_vs_perfect/episodes_per_second': metric(episodes / min(elapsed), 'episodes/s', True),
+        'training/3x3_vs_perfect/table_size': metric(len(player1.QTable), 'rows', False)
+    }
+
+
+#----------| Threats |---------#
+def bench_threats(games, seed, repeat):
+    rng = np.random.default_rng(seed)
+    boards = rng.choice([0, 1, 2], size=(games, 15, 15), p=[0.8, 0.1, 0.1]).astype(np.int8)
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        score_cells(boards, 1, 5)
+        seconds.append(time.perf_counter() - start)
+    return {'threats/15x15/boards_per_second': metric(games / min(seconds), 'boards/s', True)}
+
+
+#----------| Imports |---------#
+IMPORT_TARGETS = {
+    'core': 'import gomoku, GomokuGame, Player',
+    'random_vs_perfect': "from GomokuGame import GomokuGame; from players import create_player; "
+                         "GomokuGame(create_player('random', 'Random'), create_player('perfect', 'Perfect'), size=3, pieces_in_row_to_win=3).run_game()",
+    'qplayer': 'import QPlayer',
+    'tournament': 'import tournament',
+    'game_server': 'import game_server',
+    'training': 'import training',
+}
+
+
+def bench_imports(repeat):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [directory, os.environ.get('PYTHONPATH')])))
+    metrics = {}
+    # training.py opens its log file in the working directory when imported
+    with tempfile.TemporaryDirectory() as scratch:
+        def run_python(code):
+            return subprocess.run([sys.executable, '-c', code], cwd=scratch, env=env, check=True, capture_output=True, text=True).stdout
+
+        def fastest(code):
+            seconds = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run_python(code)
+                seconds.append(time.perf_counter() - start)
+            return min(seconds)
+
+        startup = fastest('pass')
+        metrics['imports/interpreter/startup_ms'] = metric(startup * 1000, 'ms', False, IMPORT_MIN_DELTA_MS)
+        for name, code in IMPORT_TARGETS.items():
+            metrics[f'imports/{name}/ms'] = metric(max(0.0, fastest(code) - startup) * 1000, 'ms', False, IMPORT_MIN_DELTA_MS)
+            pandas_loaded = run_python(f"{code}; import sys; print(int('pandas' in sys.modules))").split()[-1]
+            metrics[f'imports/{name}/pandas_loaded'] = metric(int(pandas_loaded), 'bool', False)
+    return metrics
+
+
+#---------| Compare |----------#
+def compare(results, baseline, tolerance, latency_tolerance=0.5):
+    """
+    Print every metric next to its baseline value.
+
+    Returns:
+    The names of the metrics that got worse by more than their tolerance (a fraction of the baseline:
+    `latency_tolerance` for NOISY_METRICS, `tolerance` for the others) and by more than their min_delta.
+    """
+    regressions = []
+    for name, current in results['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if base is None:
+            print(f'{name:<55} {current["value"]:14.2f} {current["unit"]:<11} (no baseline)')
+            continue
+        delta = current['value'] - base['value']
+        worse_delta = -delta if current['higher_is_better'] else delta
+        # A metric that was 0 (e.g. pandas_loaded) got infinitely worse as soon as it grew
+        change = delta / base['value'] if base['value'] else math.copysign(math.inf, delta) if delta else 0.0
+        worse = worse_delta / base['value'] if base['value'] else (math.inf if worse_delta > 0 else 0.0)
+        allowed = latency_tolerance if name.startswith(NOISY_METRICS) else tolerance
+        flag = ''
+        if worse > allowed and worse_delta > current.get('min_delta', 0.0):
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<55} {current["value"]:14.2f} {current["unit"]:<11} {change * 100:+7.1f}%{flag}')
+    return regressions
+
+
+def run(args):
+    metrics = {}
+    metrics.update(bench_engine(3, 3, args.games, args.seed, args.repeat))
+    metrics.update(bench_engine(15, 5, max(1, args.games // 5), args.seed, args.repeat))
+    metrics.update(bench_players(args.games, args.seed, args.repeat))
+    metrics.update(bench_training(args.episodes, args.seed, args.repeat))
+    metrics.update(bench_threats(args.games, args.seed, args.repeat))
+    metrics.update(bench_imports(args.repeat))
+    return {
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'games': args.games,
+        'episodes': args.episodes,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'metrics': metrics
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the engine, the players and training.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--games', type=int, default=1000, help='Random games for the engine and latency benchmarks')
+    parser.add_argument('--episodes', type=int, default=2000, help='Training episodes')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of every benchmark; throughput and startup keep the fastest, latency the median')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where the results are written')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before a metric counts as a regression')
+    parser.add_argument('--latency-tolerance', type=float, default=0.50, help='Allowed slowdown of the latency and import metrics')
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.latency_tolerance)
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}')
+            sys.exit(1)
+    else:
+        for name, current in results['metrics'].items():
+            print(f'{name:<55} {current["value"]:14.2f} {current["unit"]}')
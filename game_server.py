@@ -0,0 +1,241 @@
+from gomoku import Gomoku, copy_game_state
+from players import make_player, PLAYER_KINDS
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import itertools
+import logging
+
+"""
+Asyncio game server: every TCP connection can play games against a bot, and one process hosts as many
+concurrent games as there are connections.
+
+Line protocol, one command per line, coordinates in decimal:
+
+    client                          server
+    NEW <bot> [size] [k] [X|O]      GAME <id> <size> <k> <side>   start a game against a bot player spec
+                                                                  (see players.py), playing `side`
+    MOVE <x> <y>                    MOVED <side> <x> <y>          sent for every move, the client's too
+                                    END <X|O|DRAW>                when the game is over
+    STATS                           STATS <active> <games> <moves>
+    QUIT                            (closes the connection)
+                                    ERR <message>                 on an illegal command or move
+
+Bots answer through an executor: by default a process pool, so a slow bot (PerfectPlayer, QPlayer,
+SearchPlayer, MCTSPlayer) never blocks the event loop or the other games. Every worker process builds
+each bot once and keeps it. Q players are served frozen, so every worker plays the same fixed policy
+and live games never change their tables.
+"""
+
+logger = logging.getLogger('gomoku_server_logger')
+
+_bots = {}
+
+
+#---------| Bot moves |--------#
+def bot_move(spec, size, pieces_in_row_to_win, game_state):
+    # Runs in a worker process
+    key = (spec, size, pieces_in_row_to_win)
+    if key not in _bots:
+        _bots[key] = make_player(spec, size, pieces_in_row_to_win, frozen=True)
+    return _bots[key].get_move(game_state)
+
+
+class AsyncPlayer:
+    """
+    A player whose moves are awaited, so waiting on it lets the other games go on.
+    """
+
+    def __init__(self, name='Anonymous Player'):
+        self.name = name
+
+    async def get_move(self, game_state):
+        raise NotImplementedError("This method should be overridden in a subclass")
+
+    async def score(self, score):
+        pass
+
+
+class BotPlayer(AsyncPlayer):
+
+    def __init__(self, spec, size, pieces_in_row_to_win, executor):
+        super().__init__(spec)
+        self.spec = spec
+        self.size = size
+        self.pieces_in_row_to_win = pieces_in_row_to_win
+        self.executor = executor
+
+    async def get_move(self, game_state):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, bot_move, self.spec, self.size, self.pieces_in_row_to_win, game_state)
+
+
+class RemotePlayer(AsyncPlayer):
+    """
+    The player on the other end of a connection. Its moves are the MOVE commands the connection reads.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.moves = asyncio.Queue()
+
+    async def get_move(self, game_state):
+        return await self.moves.get()
+
+
+class AsyncGomokuGame:
+    """
+    The asynchronous counterpart of GomokuGame: the same loop, awaiting the players' moves.
+    """
+
+    def __init__(self, player1, player2, size = 15, pieces_in_row_to_win = 5, on_move=None):
+        self.game = Gomoku(size = size, pieces_in_row_to_win = pieces_in_row_to_win)
+        self.players = {'X': player1, 'O': player2}
+        # Awaited after every move with (side, x, y)
+        self.on_move = on_move
+
+    # Returns (player1 score, player2 score)
+    async def run_game(self):
+        while not self.game.game_over:
+            side = self.game.current_player
+            # Bots may run in another process, so they get their own copy of the state
+            state = copy_game_state(self.game.get_game_state())
+            x, y = await self.players[side].get_move(state)
+            self.game.move(x, y)
+            if self.on_move:
+                await self.on_move(side, x, y)
+        winner = self.game.winner
+        result = (0.5, 0.5) if winner is None else (1.0, 0.0) if winner == 'X' else (0.0, 1.0)
+        await self.players['X'].score(result[0])
+        await self.players['O'].score(result[1])
+        return result
+
+
+class GameServer:
+
+    #-----------| Init |-----------#
+    def __init__(self, executor):
+        self.executor = executor
+        self.game_ids = itertools.count(1)
+        self.active = 0
+        self.games = 0
+        self.moves = 0
+
+    #----------| Public |----------#
+    async def handle(self, reader, writer):
+        # The game of this connection and the task running it
+        game, task = None, None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, *args = line.decode('ascii', 'replace').split() or ['']
+                if command == 'QUIT':
+                    break
+                elif command == 'STATS':
+                    await self._send(writer, f'STATS {self.active} {self.games} {self.moves}')
+                elif command == 'NEW':
+                    if task and not task.done():
+                        await self._send(writer, 'ERR game in progress')
+                    else:
+                        game, task = await self._new_game(writer, args)
+                elif command == 'MOVE':
+                    if task is None or task.done():
+                        await self._send(writer, 'ERR no game in progress')
+                    else:
+                        await self._remote_move(writer, game, args)
+                else:
+                    await self._send(writer, f'ERR unknown command {command}')
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if task and not task.done():
+                task.cancel()
+            writer.close()
+
+    #---------| Private |---------#
+    async def _new_game(self, writer, args):
+        try:
+            spec = args[0]
+            size = int(args[1]) if len(args) > 1 else 3
+            pieces_in_row_to_win = int(args[2]) if len(args) > 2 else min(size, 5)
+            side = args[3] if len(args) > 3 else 'X'
+            if side not in ('X', 'O') or size < 1 or not 0 < pieces_in_row_to_win <= size:
+                raise ValueError
+        except (IndexError, ValueError):
+            await self._send(writer, 'ERR usage NEW <bot> [size] [k] [X|O]')
+            return None, None
+        if spec.partition(':')[0] not in PLAYER_KINDS:
+            await self._send(writer, f'ERR unknown bot {spec}, use one of {",".join(PLAYER_KINDS)}')
+            return None, None
+        remote = RemotePlayer('Remote')
+        bot = BotPlayer(spec, size, pieces_in_row_to_win, self.executor)
+        players = (remote, bot) if side == 'X' else (bot, remote)
+        game_id = next(self.game_ids)
+
+        async def on_move(moved_side, x, y):
+            self.moves += 1
+            await self._send(writer, f'MOVED {moved_side} {x} {y}')
+
+        game = AsyncGomokuGame(*players, size=size, pieces_in_row_to_win=pieces_in_row_to_win, on_move=on_move)
+        game.remote, game.side = remote, side
+        await self._send(writer, f'GAME {game_id} {size} {pieces_in_row_to_win} {side}')
+        return game, asyncio.create_task(self._play(writer, game, game_id))
+
+    async def _play(self, writer, game, game_id):
+        self.active += 1
+        try:
+            await game.run_game()
+            self.games += 1
+            await self._send(writer, f'END {game.game.winner or "DRAW"}')
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logger.exception('Game %d failed', game_id)
+            await self._send(writer, f'ERR {type(e).__name__}: {e}')
+        finally:
+            self.active -= 1
+
+    async def _remote_move(self, writer, game, args):
+        try:
+            x, y = int(args[0]), int(args[1])
+        except (IndexError, ValueError):
+            await self._send(writer, 'ERR usage MOVE <x> <y>')
+            return
+        board = game.game
+        # A move still waiting in the queue has not been played yet, so it is still the client's turn
+        if board.current_player != game.side or not game.remote.moves.empty():
+            await self._send(writer, 'ERR not your turn')
+        elif not (0 <= x < board.size and 0 <= y < board.size) or board.board[x][y] != ' ':
+            await self._send(writer, 'ERR illegal move')
+        else:
+            game.remote.moves.put_nowait((x, y))
+
+    async def _send(self, writer, message):
+        writer.write(message.encode('ascii') + b'\n')
+        await writer.drain()
+
+
+async def serve(host, port, workers):
+    executor = ProcessPoolExecutor(workers)
+    server = GameServer(executor)
+    tcp_server = await asyncio.start_server(server.handle, host, port, limit=1024)
+    print(f'Serving on {host}:{port} with {workers} bot workers')
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve games against bot players over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4, help='Processes computing bot moves')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
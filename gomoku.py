@@ -1,3 +1,77 @@
+import itertools
+import math
+
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+_windows_cache = {}
+
+
+def _build_windows(size, pieces_in_row_to_win):
+    """
+    Build every window of `pieces_in_row_to_win` cells in a row on a size x size board.
+
+    Returns:
+    (windows, cell_windows) where windows is a list of (cells, direction) and cell_windows[x][y]
+    lists the ids of the windows that contain (x, y).
+    """
+    key = (size, pieces_in_row_to_win)
+    if key not in _windows_cache:
+        windows = []
+        cell_windows = [[[] for _ in range(size)] for _ in range(size)]
+        for x in range(size):
+            for y in range(size):
+                for dx, dy in DIRECTIONS:
+                    cells = [(x + dx * i, y + dy * i) for i in range(pieces_in_row_to_win)]
+                    if all(0 <= cx < size and 0 <= cy < size for cx, cy in cells):
+                        for cx, cy in cells:
+                            cell_windows[cx][cy].append(len(windows))
+                        windows.append((tuple(cells), (dx, dy)))
+        _windows_cache[key] = (windows, cell_windows)
+    return _windows_cache[key]
+
+
+def snapshot_of(game_state):
+    """
+    Get the snapshot of a game state, building it from the board if the state does not carry one.
+
+    A snapshot is an immutable, hashable (cells, current_player) tuple, where cells holds the board
+    row by row as b' ', b'X' and b'O' bytes.
+    """
+    if 'snapshot' in game_state:
+        return game_state['snapshot']
+    return (''.join(position for row in game_state['board'] for position in row).encode('ascii'), game_state['current_player'])
+
+
+def empty_cells_of(game_state):
+    """
+    Get the empty (x, y) cells of a game state, scanning the board if the state does not carry them.
+    """
+    if 'empty_cells' in game_state:
+        return game_state['empty_cells']
+    return [(x, y) for x, row in enumerate(game_state['board']) for y, spot in enumerate(row) if spot == ' ']
+
+
+def copy_game_state(game_state):
+    """
+    Get a copy of a game state that later moves of its game do not change, to keep it or send it to
+    another process. The live "candidates" generator of the game is left out.
+    """
+    state = {key: value for key, value in game_state.items() if key != 'candidates'}
+    state['board'] = [row[:] for row in game_state['board']]
+    if 'empty_cells' in game_state:
+        state['empty_cells'] = list(game_state['empty_cells'])
+    return state
+
+
+def peek_snapshot(snapshot, x, y):
+    """
+    Get the snapshot after the side to move of `snapshot` places a piece at (x, y). The side to move
+    is left unchanged, so the result can be looked up from the same player's point of view.
+    """
+    cells, current_player = snapshot
+    index = x * math.isqrt(len(cells)) + y
+    return (cells[:index] + current_player.encode('ascii') + cells[index + 1:], current_player)
+
+
 class Gomoku:
     def __init__(self, size = 15, pieces_in_row_to_win = 5, starting_board=None, next_player=None):
         """
@@ -12,6 +86,28 @@ class Gomoku:
         self.winner = None  # Added winner to game state
         self.pieces_in_row_to_win = pieces_in_row_to_win
         self._empty_space = size*size if starting_board is None else sum(1 for c in sum(starting_board,[]) if c==' ')
+        self.history = []
+        self._cells = bytearray(''.join(position for row in self.board for position in row).encode('ascii'))
+        self._snapshot = None
+        # The empty cells in no particular order, and the index of every cell in that list (-1 when
+        # occupied), so a move removes its cell by swapping it with the last one
+        self._empty_cells = [(x, y) for x in range(size) for y in range(size) if self.board[x][y] == ' ']
+        self._empty_index = [-1] * (size * size)
+        for index, (x, y) in enumerate(self._empty_cells):
+            self._empty_index[x * size + y] = index
+        # Stones of the starting board, which are not in the history and are never taken back
+        self._preset_stones = [(x, y) for x in range(size) for y in range(size) if self.board[x][y] != ' ']
+        # Stone counts of every window of pieces_in_row_to_win cells, and for each player the windows
+        # the opponent has no stone in, grouped by how many stones the player has there
+        self._windows, self._cell_windows = _build_windows(size, pieces_in_row_to_win)
+        self._window_counts = {player: [0] * len(self._windows) for player in self.players}
+        self._open_windows = {player: [set() for _ in range(pieces_in_row_to_win + 1)] for player in self.players}
+        for player in self.players:
+            self._open_windows[player][0].update(range(len(self._windows)))
+        for x, row in enumerate(self.board):
+            for y, piece in enumerate(row):
+                if piece != ' ':
+                    self._update_windows(x, y, piece, 1)
 
     def print_board(self):
         """
@@ -42,6 +138,11 @@ class Gomoku:
             return False
         self.board[x][y] = self.current_player
         self._empty_space -= 1
+        self.history.append((x, y))
+        self._cells[x * self.size + y] = ord(self.current_player)
+        self._snapshot = None
+        self._remove_empty_cell(x, y)
+        self._update_windows(x, y, self.current_player, 1)
         if self._check_winner(x, y):
             self.game_over = True
             self.winner = self.current_player
@@ -55,19 +156,123 @@ class Gomoku:
         return True
 
 
+    def undo(self):
+        """
+        Take back the last move, restoring the side to move and the window counts.
+
+        Returns:
+        The (x, y) coordinates of the move taken back, or None if no move was made.
+        """
+        if not self.history:
+            return None
+        x, y = self.history.pop()
+        player = self.board[x][y]
+        self._update_windows(x, y, player, -1)
+        self.board[x][y] = ' '
+        self._cells[x * self.size + y] = ord(' ')
+        self._snapshot = None
+        self._empty_index[x * self.size + y] = len(self._empty_cells)
+        self._empty_cells.append((x, y))
+        self._empty_space += 1
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return x, y
+
+    def empty_cells(self):
+        """
+        Get the empty (x, y) cells, in no particular order. The list is kept up to date by every move
+        and undo, so it must not be modified; copy it to keep it.
+        """
+        return self._empty_cells
+
+    def candidate_moves(self, radius=1):
+        """
+        Generate the empty cells within `radius` of a stone, each once, nearest to the latest moves
+        first and then to the stones of the starting board. On an empty board the only candidate is
+        the center.
+        """
+        if not self.history and not self._preset_stones:
+            yield self.size // 2, self.size // 2
+            return
+        seen = set()
+        for sx, sy in itertools.chain(reversed(self.history), self._preset_stones):
+            for x in range(max(0, sx - radius), min(self.size, sx + radius + 1)):
+                for y in range(max(0, sy - radius), min(self.size, sy + radius + 1)):
+                    if self.board[x][y] == ' ' and (x, y) not in seen:
+                        seen.add((x, y))
+                        yield x, y
+
+    def winning_cells(self, player):
+        """
+        Get the empty cells where `player` would complete exactly `pieces_in_row_to_win` pieces in a row.
+
+        Args:
+        player (str): 'X' or 'O'.
+
+        Returns:
+        A set of (x, y) coordinates.
+        """
+        cells = set()
+        for window in self._open_windows[player][self.pieces_in_row_to_win - 1]:
+            window_cells, (dx, dy) = self._windows[window]
+            (first_x, first_y), (last_x, last_y) = window_cells[0], window_cells[-1]
+            # A piece just outside the window would make the line longer than pieces_in_row_to_win
+            if self._is_on_board(first_x - dx, first_y - dy) and self.board[first_x - dx][first_y - dy] == player:
+                continue
+            if self._is_on_board(last_x + dx, last_y + dy) and self.board[last_x + dx][last_y + dy] == player:
+                continue
+            cells.update(cell for cell in window_cells if self.board[cell[0]][cell[1]] == ' ')
+        return cells
+
+    def open_threats(self, player, length):
+        """
+        Get the windows of `pieces_in_row_to_win` cells holding exactly `length` pieces of `player`
+        and none of the opponent.
+
+        Args:
+        player (str): 'X' or 'O'.
+        length (int): The number of the player's pieces in the window.
+
+        Returns:
+        A list of windows, each a tuple of (x, y) coordinates.
+        """
+        return [self._windows[window][0] for window in self._open_windows[player][length]]
+
+    def get_snapshot(self):
+        """
+        Get an immutable, hashable snapshot of the position (see `snapshot_of`). It is built once per
+        move and reused until the next move.
+        """
+        if self._snapshot is None:
+            self._snapshot = (bytes(self._cells), self.current_player)
+        return self._snapshot
+
+    def peek_move(self, x, y):
+        """
+        Get the snapshot after the current player places a piece at (x, y), without making the move.
+        """
+        return peek_snapshot(self.get_snapshot(), x, y)
+
     def get_game_state(self):
         """
         Get the current game state.
 
         Returns:
         A dictionary representing the game state. The keys are "board", "current_player", 
-        "game_over", and "winner", and the corresponding values represent the state of the game.
+        "game_over", "winner", "pieces_in_row_to_win", "snapshot", "empty_cells" and "candidates", and the corresponding values
+        represent the state of the game. "empty_cells" is the live list of `empty_cells()` and
+        "candidates" is `candidate_moves`, to call for a generator of the cells near the stones.
         """
         return {
             "board": self.board,
             "current_player": self.current_player,
             "game_over": self.game_over,
-            "winner": self.winner  # Added winner to game state
+            "winner": self.winner,  # Added winner to game state
+            "pieces_in_row_to_win": self.pieces_in_row_to_win,
+            "snapshot": self.get_snapshot(),
+            "empty_cells": self._empty_cells,
+            "candidates": self.candidate_moves
         }
 
     # Private methods
@@ -82,8 +287,10 @@ class Gomoku:
         Returns:
         True if the current player has won, False otherwise.
         """
-        # Define all 8 directions as (dx, dy) pairs
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+        # Only walk the board along directions where a window through (x, y) is full, to check
+        # that the line is exactly pieces_in_row_to_win long
+        counts = self._window_counts[self.current_player]
+        directions = {self._windows[window][1] for window in self._cell_windows[x][y] if counts[window] == self.pieces_in_row_to_win}
 
         for dx, dy in directions:
             if self._count_consecutive_pieces(x, y, dx, dy) == self.pieces_in_row_to_win:
@@ -91,6 +298,35 @@ class Gomoku:
 
         return False
 
+    def _remove_empty_cell(self, x, y):
+        index = self._empty_index[x * self.size + y]
+        last = self._empty_cells.pop()
+        if last != (x, y):
+            self._empty_cells[index] = last
+            self._empty_index[last[0] * self.size + last[1]] = index
+        self._empty_index[x * self.size + y] = -1
+
+    def _update_windows(self, x, y, player, delta):
+        """
+        Add (delta=1) or remove (delta=-1) a piece of `player` at (x, y) in the counts of every window
+        through that cell.
+        """
+        opponent = self.players[0] if player == self.players[1] else self.players[1]
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[opponent]
+        open_windows = self._open_windows[player]
+        opponent_open_windows = self._open_windows[opponent]
+        for window in self._cell_windows[x][y]:
+            before = counts[window]
+            counts[window] = before + delta
+            if opponent_counts[window] == 0:
+                open_windows[before].discard(window)
+                open_windows[before + delta].add(window)
+            if before == 0 and delta == 1:
+                opponent_open_windows[opponent_counts[window]].discard(window)
+            elif before == 1 and delta == -1:
+                opponent_open_windows[opponent_counts[window]].add(window)
+
     def _count_consecutive_pieces(self, x, y, dx, dy):
         """
         Count the number of consecutive pieces of the same type along a certain direction.
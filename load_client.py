@@ -0,0 +1,93 @@
+from gomoku import Gomoku
+import argparse
+import asyncio
+import random
+import time
+
+"""
+Load generator for game_server.py: opens `concurrency` connections, each playing random legal moves
+against a bot game after game until `sessions` games are done, and reports games and moves per second
+and the latency of the server's answers.
+"""
+
+
+class LoadStats:
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.errors = 0
+        self.latencies = []
+
+
+async def play_games(host, port, bot, size, pieces_in_row_to_win, remaining, stats, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(line):
+        writer.write(line.encode('ascii') + b'\n')
+        await writer.drain()
+
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            side = rng.choice('XO')
+            await send(f'NEW {bot} {size} {pieces_in_row_to_win} {side}')
+            # The client keeps its own board, so it knows when a move ended the game and the next
+            # line will be END
+            game = Gomoku(size=size, pieces_in_row_to_win=pieces_in_row_to_win)
+            sent = None
+            while True:
+                if not game.game_over and game.current_player == side and sent is None:
+                    move = rng.choice(game.empty_cells())
+                    sent = time.perf_counter()
+                    await send(f'MOVE {move[0]} {move[1]}')
+                words = (await reader.readline()).decode('ascii').split()
+                if not words:
+                    return
+                if words[0] == 'MOVED':
+                    moved_side, x, y = words[1], int(words[2]), int(words[3])
+                    game.move(x, y)
+                    stats.moves += 1
+                    if moved_side != side:
+                        if sent is not None:
+                            # Time from sending a move to the bot's answer
+                            stats.latencies.append(time.perf_counter() - sent)
+                        sent = None
+                elif words[0] == 'END':
+                    stats.games += 1
+                    break
+                elif words[0] == 'ERR':
+                    stats.errors += 1
+                    break
+        await send('QUIT')
+    finally:
+        writer.close()
+
+
+async def run(args):
+    stats = LoadStats()
+    remaining = [args.sessions]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        play_games(args.host, args.port, args.bot, args.size, args.pieces_in_row_to_win, remaining, stats, random.Random(args.seed + client))
+        for client in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    latencies = sorted(stats.latencies) or [0.0]
+    at = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f'{stats.games} games, {stats.moves} moves, {stats.errors} errors in {elapsed:.2f}s: '
+          f'{stats.games / elapsed:.1f} games/s, {stats.moves / elapsed:.1f} moves/s')
+    print(f'bot answer latency p50 {at(0.50):.2f}ms, p90 {at(0.90):.2f}ms, p99 {at(0.99):.2f}ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate load on game_server.py.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sessions', type=int, default=1000, help='Games to play in total')
+    parser.add_argument('--concurrency', type=int, default=100, help='Connections playing at the same time')
+    parser.add_argument('--bot', default='random', help='Bot player spec, see players.py')
+    parser.add_argument('--size', type=int, default=3)
+    parser.add_argument('--pieces-in-row-to-win', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
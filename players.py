@@ -0,0 +1,82 @@
+import importlib
+
+"""
+Registry of the player implementations, keyed by name.
+
+Entry points build players through the registry instead of importing every player module, so a module
+(and what it depends on: numpy for the Q players and the opening book, pandas for the CSV tables) is
+only imported when a player of that kind is actually made. The core needed to play a game (gomoku,
+GomokuGame and Player) has no third-party dependency.
+
+`make_player` builds a player from a spec, as tournaments and the game server take them:
+
+    random                  RandomPlayer
+    perfect, perfect:solved PerfectPlayer (rule cascade or solved table)
+    qplayer:<name>          QPlayer reading Qtable_<name>.csv
+    aggressive:<name>       QPlayerAggressive reading Qtable_Agressive_<name>.csv
+    frozen:<name>           QPlayer in frozen inference mode, mapping Qtable_<name>.qtb read-only
+    qtable:<path>           QPlayer on a checkpoint file (.csv, or .qtb mapped read-only and frozen)
+    search[:<seconds>]      SearchPlayer with a time budget per move
+    mcts[:<playouts>]       MCTSPlayer with a playout budget per move
+
+With frozen=True every Q player is built in frozen mode, so it plays a fixed policy and never updates
+its table, as tournaments and the game server need.
+"""
+
+# Player name -> (module, class)
+PLAYERS = {
+    'human': ('Player', 'HumanPlayer'),
+    'random': ('Player', 'RandomPlayer'),
+    'perfect': ('PerfectPlayer', 'PerfectPlayer'),
+    'qplayer': ('QPlayer', 'QPlayer'),
+    'aggressive': ('QPlayerAggressive', 'QPlayerAggressive'),
+    'search': ('SearchPlayer', 'SearchPlayer'),
+    'mcts': ('MCTSPlayer', 'MCTSPlayer'),
+    'book': ('OpeningBook', 'BookPlayer'),
+}
+
+PLAYER_KINDS = ['random', 'perfect', 'qplayer', 'aggressive', 'frozen', 'qtable', 'search', 'mcts']
+
+
+#----------| Registry |--------#
+def register_player(name, module, class_name):
+    PLAYERS[name] = (module, class_name)
+
+
+def player_class(name):
+    """
+    Get the class registered as `name`, importing its module on first use.
+    """
+    if name not in PLAYERS:
+        raise ValueError(f'Unknown player {name}, use one of {", ".join(PLAYERS)}')
+    module, class_name = PLAYERS[name]
+    return getattr(importlib.import_module(module), class_name)
+
+
+def create_player(name, *args, **kwargs):
+    return player_class(name)(*args, **kwargs)
+
+
+#------------| Specs |---------#
+def make_player(spec, size, pieces_in_row_to_win, frozen=False):
+    kind, _, argument = spec.partition(':')
+    if kind == 'random':
+        return create_player('random', spec)
+    if kind == 'perfect':
+        return create_player('perfect', spec, solved=argument == 'solved')
+    if kind == 'qplayer':
+        return create_player('qplayer', argument, size=size, frozen=frozen)
+    if kind == 'aggressive':
+        return create_player('aggressive', argument, size=size, frozen=frozen)
+    if kind == 'frozen':
+        return create_player('qplayer', argument, size=size, frozen=True)
+    if kind == 'qtable':
+        from QTable import QTable, MappedQTable
+        if argument.endswith('.qtb'):
+            return create_player('qplayer', spec, qtable=MappedQTable(argument, size), frozen=True)
+        return create_player('qplayer', spec, qtable=QTable(size).load(argument), frozen=frozen)
+    if kind == 'search':
+        return create_player('search', spec, pieces_in_row_to_win=pieces_in_row_to_win, time_limit=float(argument or 1.0))
+    if kind == 'mcts':
+        return create_player('mcts', spec, pieces_in_row_to_win=pieces_in_row_to_win, playouts=int(argument or 1000))
+    raise ValueError(f'Unknown player spec {spec}')
@@ -0,0 +1,52 @@
+from GomokuGame import GomokuGame
+from PerfectPlayer import PerfectPlayer
+from QPlayer import QPlayer
+from QTable import QTable
+import argparse
+import logging
+import random
+import time
+
+"""
+Compares how many episodes a fresh QPlayer needs against the PerfectPlayer to stop losing, with and
+without symmetry-canonicalized state keys. A run has converged after a window of `window` episodes
+without a single loss.
+"""
+
+
+def episodes_to_zero_losses(canonical, seed, window, max_episodes):
+    random.seed(seed)
+    player1 = QPlayer('Benchmark', qtable=QTable(3), canonical=canonical)
+    player2 = PerfectPlayer('Perfect')
+    logger = logging.getLogger('gomoku_benchmark_logger')
+    losses_in_window = 0
+    for episode in range(1, max_episodes + 1):
+        result = GomokuGame(player1, player2, size=3, pieces_in_row_to_win=3, logger=logger).run_game()
+        if result[1] == 1.0:
+            losses_in_window += 1
+        if episode % window == 0:
+            if losses_in_window == 0:
+                return episode, len(player1.QTable)
+            losses_in_window = 0
+    return None, len(player1.QTable)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Episodes to a zero-loss rate with and without symmetry canonicalization.')
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--max-episodes', type=int, default=20000)
+    args = parser.parse_args()
+
+    for canonical in (False, True):
+        episodes, sizes = [], []
+        start = time.perf_counter()
+        for seed in range(args.seeds):
+            converged_at, table_size = episodes_to_zero_losses(canonical, seed, args.window, args.max_episodes)
+            episodes.append(converged_at)
+            sizes.append(table_size)
+        elapsed = time.perf_counter() - start
+        converged = [e for e in episodes if e is not None]
+        mean_episodes = f'{sum(converged) / len(converged):.0f}' if converged else 'n/a'
+        print(f'canonical={canonical}: episodes to zero losses {episodes} (mean {mean_episodes}), '
+              f'table sizes {sizes}, {elapsed:.1f}s')
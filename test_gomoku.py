@@ -0,0 +1,55 @@
+from BitboardGomoku import BitboardGomoku
+from gomoku import Gomoku
+
+
+def empty_board(size):
+    return [[' ' for _ in range(size)] for _ in range(size)]
+
+
+def test_candidate_moves_of_an_empty_board_is_the_center():
+    assert list(Gomoku(size=7, pieces_in_row_to_win=4).candidate_moves()) == [(3, 3)]
+
+
+def test_candidate_moves_surround_the_stones_of_a_starting_board():
+    board = empty_board(7)
+    board[0][0], board[6][6] = 'X', 'O'
+    game = Gomoku(size=7, pieces_in_row_to_win=4, starting_board=board, next_player='X')
+    assert sorted(game.candidate_moves()) == [(0, 1), (1, 0), (1, 1), (5, 5), (5, 6), (6, 5)]
+
+
+def test_bitboard_candidates_match_gomoku():
+    board = empty_board(7)
+    board[0][0], board[6][6] = 'X', 'O'
+    game = Gomoku(size=7, pieces_in_row_to_win=4, starting_board=[row[:] for row in board], next_player='X')
+    bitboard = BitboardGomoku(size=7, pieces_in_row_to_win=4, starting_board=[row[:] for row in board], next_player='X')
+    assert sorted(bitboard.candidate_moves()) == sorted(game.candidate_moves())
+    assert list(BitboardGomoku(size=7, pieces_in_row_to_win=4).candidate_moves()) == [(3, 3)]
+
+
+def test_bitboard_candidates_do_not_wrap_around_an_edge():
+    board = empty_board(7)
+    board[2][6] = 'X'
+    game = Gomoku(size=7, pieces_in_row_to_win=4, starting_board=[row[:] for row in board], next_player='O')
+    bitboard = BitboardGomoku(size=7, pieces_in_row_to_win=4, starting_board=[row[:] for row in board], next_player='O')
+    assert sorted(bitboard.candidate_moves(radius=2)) == sorted(game.candidate_moves(radius=2))
+
+
+def test_candidate_moves_put_the_latest_move_first():
+    board = empty_board(7)
+    board[0][0] = 'X'
+    game = Gomoku(size=7, pieces_in_row_to_win=4, starting_board=board, next_player='O')
+    game.move(6, 6)
+    candidates = list(game.candidate_moves())
+    assert set(candidates[:3]) == {(5, 5), (5, 6), (6, 5)}
+    assert set(candidates[3:]) == {(0, 1), (1, 0), (1, 1)}
+    game.undo()
+    assert sorted(game.candidate_moves()) == [(0, 1), (1, 0), (1, 1)]
+
+
+def test_empty_cells_follow_moves_and_undos():
+    game = Gomoku(size=3, pieces_in_row_to_win=3)
+    for move in [(1, 1), (0, 0), (2, 2)]:
+        game.move(*move)
+    game.undo()
+    expected = {(x, y) for x in range(3) for y in range(3) if game.board[x][y] == ' '}
+    assert sorted(game.empty_cells()) == sorted(expected)
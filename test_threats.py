@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from BatchGomoku import EMPTY, X, O
+from threats import threat_counts, threat_counts_reference, score_cells, numba
+
+
+def random_boards(count, size, seed):
+    rng = np.random.default_rng(seed)
+    return rng.choice(np.array([EMPTY, X, O], dtype=np.int8), size=(count, size, size), p=[0.5, 0.25, 0.25])
+
+
+@pytest.mark.parametrize('size, pieces_in_row_to_win', [(3, 3), (7, 4), (15, 5)])
+def test_vectorized_counts_match_the_reference(size, pieces_in_row_to_win):
+    boards = random_boards(20, size, seed=size)
+    for player in (X, O):
+        counts = threat_counts(boards, player, pieces_in_row_to_win)
+        for board, board_counts in zip(boards, counts):
+            np.testing.assert_array_equal(board_counts, threat_counts_reference(board, player, pieces_in_row_to_win))
+
+
+@pytest.mark.skipif(numba is None, reason='numba is not installed')
+def test_numba_scores_match_numpy():
+    boards = random_boards(20, 15, seed=1)
+    np.testing.assert_allclose(score_cells(boards, X, backend='numba'), score_cells(boards, X))
+
+
+def test_unavailable_backend_raises():
+    boards = random_boards(1, 15, seed=2)
+    with pytest.raises(ValueError):
+        score_cells(boards, X, backend='cuda')
+    if numba is None:
+        with pytest.raises(ValueError):
+            score_cells(boards, X, backend='numba')
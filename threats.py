@@ -0,0 +1,170 @@
+from BatchGomoku import EMPTY, X, O
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+"""
+Threat evaluation of every empty cell of NxN boards.
+
+For a player and an empty cell, each of the 4 directions is scored by the line the player would make
+by placing a stone there: its length (the new stone plus the player's consecutive stones on both
+sides) and how many of its two ends are empty cells. Lines of 2 to k-1 stones are counted as open (both
+ends empty) or closed (one end empty); dead lines with no empty end are dropped. A line of exactly k
+stones is a win. Longer lines are dropped, as they do not win under the exact-k rule of Gomoku.
+
+Boards are int8 arrays with the cell values of BatchGomoku (EMPTY, X, O), one board of shape
+(size, size) or a batch of shape (n, size, size). `threat_counts` returns, for every cell, counts of
+shape (k + 1, 2) indexed by [length, open]; `score_cells` turns the counts of the side to move (attack)
+and of its opponent (defense) into one score per cell.
+
+`threat_counts` is vectorized over the whole batch with shifted array windows. `threat_counts_reference`
+is the same computation as plain loops over one board, kept to check the vectorized one against; when
+numba is installed it is also compiled and available as backend='numba'.
+"""
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+PIECES = {' ': EMPTY, 'X': X, 'O': O}
+
+
+#---------| Counting |---------#
+def threat_counts(boards, players, pieces_in_row_to_win=5):
+    """
+    Count the lines every empty cell would make for `players` (one per board, or one for all).
+
+    Returns:
+    An int32 array of shape boards.shape + (k + 1, 2).
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[None]
+    n, size, _ = boards.shape
+    k = pieces_in_row_to_win
+    players = np.broadcast_to(np.asarray(players, dtype=np.int8), (n,))
+
+    empty = boards == EMPTY
+    # Pad by k on every side, so every shifted window stays in the array; padding is neither mine nor empty
+    mine = np.pad(boards == players[:, None, None], ((0, 0), (k, k), (k, k)))
+    open_cells = np.pad(empty, ((0, 0), (k, k), (k, k)))
+
+    counts = np.zeros((n, size, size, k + 1, 2), dtype=np.int32)
+    for dx, dy in DIRECTIONS:
+        length = np.ones((n, size, size), dtype=np.int32)
+        ends = np.zeros((n, size, size), dtype=np.int32)
+        for sign in (1, -1):
+            running = np.ones((n, size, size), dtype=bool)
+            for step in range(1, k + 1):
+                x, y = k + sign * dx * step, k + sign * dy * step
+                # The first cell after the run is empty: an open end
+                ends += running & open_cells[:, x:x + size, y:y + size]
+                running &= mine[:, x:x + size, y:y + size]
+                length += running
+        counted = empty & (((length >= 2) & (length < k) & (ends > 0)) | (length == k))
+        is_open = ends == 2
+        for line in range(2, k + 1):
+            at_length = counted & (length == line)
+            counts[..., line, 1] += at_length & is_open
+            counts[..., line, 0] += at_length & ~is_open
+    return counts[0] if single else counts
+
+
+def threat_counts_reference(board, player, pieces_in_row_to_win=5):
+    """
+    The same counts as `threat_counts`, for one board, with plain loops.
+    """
+    size = board.shape[0]
+    k = pieces_in_row_to_win
+    counts = np.zeros((size, size, k + 1, 2), dtype=np.int32)
+    for x in range(size):
+        for y in range(size):
+            if board[x, y] != EMPTY:
+                continue
+            for dx, dy in DIRECTIONS:
+                length, ends = 1, 0
+                for sign in (1, -1):
+                    for step in range(1, k + 1):
+                        nx, ny = x + sign * dx * step, y + sign * dy * step
+                        if nx < 0 or nx >= size or ny < 0 or ny >= size:
+                            break
+                        if board[nx, ny] == player:
+                            length += 1
+                            continue
+                        if board[nx, ny] == EMPTY:
+                            ends += 1
+                        break
+                if length == k or (2 <= length < k and ends > 0):
+                    counts[x, y, length, 1 if ends == 2 else 0] += 1
+    return counts
+
+
+_threat_counts_numba = numba.njit(cache=True)(threat_counts_reference) if numba else None
+
+
+#----------| Scoring |---------#
+def line_weights(pieces_in_row_to_win=5):
+    """
+    Weight of a line by [length, open]: an open line of n stones is worth 10 ** n, a closed one 10 ** (n - 1)
+    and a winning line 10 ** (k + 1).
+    """
+    k = pieces_in_row_to_win
+    weights = np.zeros((k + 1, 2))
+    for line in range(2, k):
+        weights[line] = (10.0 ** (line - 1), 10.0 ** line)
+    weights[k] = 10.0 ** (k + 1)
+    return weights
+
+
+def score_cells(boards, players, pieces_in_row_to_win=5, defense=0.9, backend='numpy'):
+    """
+    Score every cell for the side to move: its own threats plus `defense` times the threats it blocks.
+    Occupied cells score -inf.
+
+    Args:
+    boards: One board (size, size) or a batch (n, size, size) of EMPTY / X / O values.
+    players: The side to move, X or O, one per board or one for all.
+    backend: 'numpy', or 'numba' to loop over the boards with the compiled reference (ValueError
+    when numba is not installed).
+
+    Returns:
+    A float array with the shape of boards.
+    """
+    if backend not in ('numpy', 'numba'):
+        raise ValueError(f'Unknown backend {backend}, use numpy or numba')
+    if backend == 'numba' and _threat_counts_numba is None:
+        raise ValueError('The numba backend needs numba installed')
+    boards = np.asarray(boards, dtype=np.int8)
+    opponents = np.where(np.asarray(players) == X, O, X).astype(np.int8)
+    weights = line_weights(pieces_in_row_to_win)
+    if backend == 'numba':
+        batch = boards.reshape((-1,) + boards.shape[-2:])
+        own = np.broadcast_to(np.asarray(players, dtype=np.int8), (len(batch),))
+        theirs = np.broadcast_to(opponents, (len(batch),))
+        attack = np.stack([_threat_counts_numba(board, player, pieces_in_row_to_win) for board, player in zip(batch, own)])
+        block = np.stack([_threat_counts_numba(board, player, pieces_in_row_to_win) for board, player in zip(batch, theirs)])
+        attack, block = attack.reshape(boards.shape + attack.shape[-2:]), block.reshape(boards.shape + block.shape[-2:])
+    else:
+        attack = threat_counts(boards, players, pieces_in_row_to_win)
+        block = threat_counts(boards, opponents, pieces_in_row_to_win)
+    scores = np.einsum('...lo,lo->...', attack, weights) + defense * np.einsum('...lo,lo->...', block, weights)
+    scores[boards != EMPTY] = -np.inf
+    return scores
+
+
+def score_game_state(game_state, pieces_in_row_to_win=5, defense=0.9):
+    """
+    Score every cell of a `Gomoku.get_game_state()` position for the player to move.
+    """
+    board = np.array([[PIECES[cell] for cell in row] for row in game_state['board']], dtype=np.int8)
+    return score_cells(board, PIECES[game_state['current_player']], pieces_in_row_to_win, defense)
+
+
+def best_cells(game_state, pieces_in_row_to_win=5, count=1):
+    """
+    The `count` best scoring (x, y) cells of a position, best first.
+    """
+    scores = score_game_state(game_state, pieces_in_row_to_win)
+    order = np.argsort(scores, axis=None)[::-1][:count]
+    return [divmod(int(index), scores.shape[1]) for index in order]
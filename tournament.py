@@ -0,0 +1,183 @@
+from GomokuGame import GomokuGame
+from players import make_player
+from multiprocessing import Pool
+import argparse
+import itertools
+import logging
+import math
+import random
+
+"""
+Tournament runner: plays a roster of players against each other over a process pool and rates them.
+
+Players are given as specs (see players.py for all of them), e.g. random, perfect:solved,
+qplayer:<name>, frozen:<name>, search:0.5 or mcts:2000. Only the modules of the players in the roster
+are imported.
+
+Every pairing plays an even number of games with colors alternating. Schedules are round robin or
+Swiss (players with similar scores meet, avoiding rematches where possible). Each game is appended to
+the results file as it finishes, and ratings are Bradley-Terry maximum likelihood Elo with bootstrap
+confidence intervals.
+
+All Q players play frozen: they never update their table during the tournament, so every worker plays
+the same policy and a seeded tournament gives the same ratings.
+"""
+
+_players = {}
+
+
+#---------| Players |----------#
+def _get_player(spec, size, pieces_in_row_to_win, book=None):
+    # Players are built once per worker process and reused for every match they play there
+    key = (spec, size, pieces_in_row_to_win, book)
+    if key not in _players:
+        player = make_player(spec, size, pieces_in_row_to_win, frozen=True)
+        if book:
+            from OpeningBook import OpeningBook, BookPlayer
+            player = BookPlayer(player, OpeningBook.load(book))
+        _players[key] = player
+    return _players[key]
+
+
+def play_match(match):
+    """
+    Play `games` games between two players, alternating who plays 'X'.
+
+    Returns:
+    A list of (x index, o index, score of 'X') tuples.
+    """
+    (a, spec_a), (b, spec_b), games, seed, size, pieces_in_row_to_win, book = match
+    random.seed(seed)
+    player_a = _get_player(spec_a, size, pieces_in_row_to_win, book)
+    player_b = _get_player(spec_b, size, pieces_in_row_to_win, book)
+    logger = logging.getLogger('gomoku_tournament_logger')
+    results = []
+    for game in range(games):
+        if game % 2 == 0:
+            score_x, _ = GomokuGame(player_a, player_b, size=size, pieces_in_row_to_win=pieces_in_row_to_win, logger=logger).run_game()
+            results.append((a, b, score_x))
+        else:
+            score_x, _ = GomokuGame(player_b, player_a, size=size, pieces_in_row_to_win=pieces_in_row_to_win, logger=logger).run_game()
+            results.append((b, a, score_x))
+    return results
+
+
+#---------| Schedule |---------#
+def round_robin(count):
+    return list(itertools.combinations(range(count), 2))
+
+
+def swiss_pairings(count, scores, played):
+    """
+    Pair players with similar scores, skipping pairs that already met while another opponent is left.
+    With an odd roster the lowest-ranked player without a pairing sits out.
+    """
+    ranking = sorted(range(count), key=lambda player: scores[player], reverse=True)
+    pairings = []
+    while len(ranking) > 1:
+        player = ranking.pop(0)
+        opponent = next((other for other in ranking if (min(player, other), max(player, other)) not in played), ranking[0])
+        ranking.remove(opponent)
+        pairings.append((min(player, opponent), max(player, opponent)))
+    return pairings
+
+
+def run_tournament(roster, games, workers, schedule='round-robin', rounds=None, seed=0, size=3, pieces_in_row_to_win=3, results_path='tournament_results.csv', book=None):
+    count = len(roster)
+    scores = [0.0] * count
+    played = set()
+    all_results = []
+    rounds = rounds or (math.ceil(math.log2(count)) + 1 if schedule == 'swiss' else 1)
+    games += games % 2
+
+    with Pool(workers) as pool, open(results_path, 'w') as results_file:
+        results_file.write('# ' + ' '.join(roster) + '\n')
+        for round_number in range(rounds):
+            pairings = round_robin(count) if schedule == 'round-robin' else swiss_pairings(count, scores, played)
+            matches = [((a, roster[a]), (b, roster[b]), games, seed + round_number * count * count + a * count + b, size, pieces_in_row_to_win, book) for a, b in pairings]
+            for results in pool.imap_unordered(play_match, matches):
+                for x, o, score_x in results:
+                    results_file.write(f'{x},{o},{score_x}\n')
+                    scores[x] += score_x
+                    scores[o] += 1.0 - score_x
+                    played.add((min(x, o), max(x, o)))
+                results_file.flush()
+                all_results.extend(results)
+    # Matches finish in any order; sorted, the bootstrap of a seeded tournament resamples the same list
+    return sorted(all_results)
+
+
+#----------| Ratings |---------#
+def elo_ratings(results, count, iterations=200):
+    """
+    Maximum likelihood Bradley-Terry ratings on the Elo scale (draws count as half a win), anchored so
+    the ratings average 0.
+    """
+    wins = [0.0] * count
+    meetings = {}
+    for x, o, score_x in results:
+        wins[x] += score_x
+        wins[o] += 1.0 - score_x
+        pair = (min(x, o), max(x, o))
+        meetings[pair] = meetings.get(pair, 0) + 1
+    # Half a win and half a loss against a virtual equal opponent keeps unbeaten or winless players finite
+    strength = [1.0] * count
+    for _ in range(iterations):
+        updated = []
+        for player in range(count):
+            denominator = 1.0 / (strength[player] + 1.0)
+            for (a, b), games in meetings.items():
+                if player in (a, b):
+                    other = b if player == a else a
+                    denominator += games / (strength[player] + strength[other])
+            updated.append((wins[player] + 0.5) / denominator)
+        mean_log = sum(math.log(value) for value in updated) / count
+        strength = [value / math.exp(mean_log) for value in updated]
+    return [400.0 * math.log10(value) for value in strength]
+
+
+def elo_intervals(results, count, samples=200, seed=0):
+    """
+    Bootstrap 95% confidence intervals of the ratings, resampling the games.
+    """
+    rng = random.Random(seed)
+    draws = [elo_ratings([rng.choice(results) for _ in results], count, iterations=50) for _ in range(samples)]
+    intervals = []
+    for player in range(count):
+        values = sorted(draw[player] for draw in draws)
+        intervals.append((values[int(0.025 * samples)], values[int(0.975 * samples) - 1]))
+    return intervals
+
+
+def print_table(roster, results):
+    count = len(roster)
+    ratings = elo_ratings(results, count)
+    intervals = elo_intervals(results, count)
+    scores, games = [0.0] * count, [0] * count
+    for x, o, score_x in results:
+        scores[x] += score_x
+        scores[o] += 1.0 - score_x
+        games[x] += 1
+        games[o] += 1
+    for player in sorted(range(count), key=lambda player: ratings[player], reverse=True):
+        low, high = intervals[player]
+        print(f'{roster[player]:<30} Elo {ratings[player]:7.1f} [{low:7.1f}, {high:7.1f}]  score {scores[player]:.1f}/{games[player]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a tournament between players and rate them.')
+    parser.add_argument('roster', nargs='+', help='Player specs, see tournament.py')
+    parser.add_argument('--games', type=int, default=20, help='Games per pairing (rounded up to even)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--schedule', choices=['round-robin', 'swiss'], default='round-robin')
+    parser.add_argument('--rounds', type=int, default=None, help='Swiss rounds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=3)
+    parser.add_argument('--pieces-in-row-to-win', type=int, default=3)
+    parser.add_argument('--results', default='tournament_results.csv', help='File the games are streamed to')
+    parser.add_argument('--book', help='Opening book every player answers from before its own logic')
+    args = parser.parse_args()
+
+    results = run_tournament(args.roster, args.games, args.workers, args.schedule, args.rounds, args.seed,
+                             args.size, args.pieces_in_row_to_win, args.results, args.book)
+    print_table(args.roster, results)
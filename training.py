@@ -1,11 +1,20 @@
 
 from gomoku import Gomoku  # assuming gomoku.py is the file containing the Gomoku class
 from GomokuGame import GomokuGame
-from Player import Player, HumanPlayer, RandomPlayer
-from QPlayer import QPlayer
-from PerfectPlayer import PerfectPlayer
+from GameStats import GameStats
+from QPlayer import QPlayer, MultiQPlayer, REWARD_POLICIES, LEARNING_RATE, DISCOUNT_FACTOR_GAMMA
 from QPlayerAggressive import QPlayerAggressive
+from Exploration import EXPLORATIONS, make_exploration
+from QTable import QTable
+from ReplayBuffer import ReplayBuffer
+from GameRecords import GameRecordReader, GameRecordWriter
+from Checkpoint import Checkpointer
+from players import create_player
+from multiprocessing import Pool
+import argparse
+import copy
 import logging
+import random
 import sys
 
 
@@ -25,48 +34,339 @@ file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
 
-training_episodes = 100
+def run_episodes(player1_buffer, player2_buffer, training_episodes, size=3, pieces_in_row_to_win=3, print_board=False, stats=None, log_moves_every=100, records=None,
+                 checkpoints=None, resume=None):
+    p1_score, p2_score, draws = 0.0, 0.0, 0
+    t_p1_score, t_p2_score, t_draws = 0.0, 0.0, 0
+    start = 0
+    if resume:
+        start = resume['episode']
+        p1_score, p2_score, draws, t_p1_score, t_p2_score, t_draws = resume['scores']
 
-if len(sys.argv) > 1:
-    # Get the integer argument
-    training_episodes = int(sys.argv[1])
+    for i in range(start + 1, training_episodes + 1):
+        player1 = random.choice(player1_buffer)
+        player2 = random.choice(player2_buffer)
+        logger.info('Player1 type %s, Player2 type %s', type(player1), type(player2))
+        # Only one game in log_moves_every has its moves logged (none with 0)
+        game = GomokuGame(player1, player2, size=size, pieces_in_row_to_win=pieces_in_row_to_win, logger=logger, print_board=print_board,
+                          stats=stats, log_moves=bool(log_moves_every) and i % log_moves_every == 0)
+        result = game.run_game()
+        if records:
+            records.write(game.game.history, game.game.winner)
+        logger.info('Episode %d, %s', i, result)
+        p1_score += result[0]
+        p2_score += result[1]
+        if result[0]==result[1]:
+            draws += 1
+        if i % 100 == 0 :
+            print_scores(i, p1_score - t_p1_score, p2_score - t_p2_score, draws - t_draws)
+            t_p1_score, t_p2_score, t_draws = p1_score, p2_score, draws
+        if checkpoints and (i == training_episodes or checkpoints.due(i)):
+            scores = (p1_score, p2_score, draws, t_p1_score, t_p2_score, t_draws)
+            checkpoints.save(i, capture_state(player1_buffer, 'serial', size, pieces_in_row_to_win, i, scores))
 
-import random
+    return p1_score, p2_score, draws
+
+
+#--------| Checkpoints |-------#
+def capture_state(players, mode, size, pieces_in_row_to_win, episode, scores, **extra):
+    """
+    Snapshot of a training run for a checkpoint: the tables and replay buffers of the learning players,
+    the episode counter, the running scores and the state of the random module. Everything is copied,
+    so the run can go on while the checkpoint is written.
+    """
+    learners = learning_players(players)
+    return {
+        'mode': mode,
+        'size': size,
+        'pieces_in_row_to_win': pieces_in_row_to_win,
+        'names': [player.name for player in learners],
+        'episode': episode,
+        'scores': scores,
+        'tables': [{state: dict(values) for state, values in player.QTable.rows.items()} for player in learners],
+        # Copied together, so players sharing a buffer still share it after a resume
+        'replays': copy.deepcopy([player.replay for player in learners]),
+        'explorations': copy.deepcopy([player.exploration for player in learners]),
+        'random_state': random.getstate(),
+        **extra
+    }
+
+
+def restore_state(players, state, mode, size, pieces_in_row_to_win):
+    """
+    Load a checkpoint taken by `capture_state` into the learning players and the random module.
+    """
+    learners = learning_players(players)
+    if (state['mode'], state['size'], state['pieces_in_row_to_win']) != (mode, size, pieces_in_row_to_win) or state['names'] != [player.name for player in learners]:
+        raise ValueError(f"The checkpoint is of a {state['mode']} run of {state['names']} on {state['size']}x{state['size']}, "
+                         f"{state['pieces_in_row_to_win']} in a row; resume it with the same settings")
+    for player, rows, replay, exploration in zip(learners, state['tables'], state['replays'], state['explorations']):
+        player.QTable.rows = rows
+        player.replay = replay
+        player.exploration = exploration
+    random.setstate(state['random_state'])
+
+
+#---------| Learners |---------#
+def make_learner(name, reward='standard', **options):
+    # The aggressive policy keeps its table apart, in Qtable_Agressive_<name>.csv
+    if reward == 'aggressive':
+        return QPlayerAggressive(name, **options)
+    return QPlayer(name, reward=reward, **options)
+
+
+def learning_players(players):
+    """
+    The Q players that learn in a player buffer, including every variant of a MultiQPlayer.
+    """
+    learners = []
+    for player in players:
+        learners.extend(player.players if isinstance(player, MultiQPlayer) else [player])
+    return [player for player in learners if hasattr(player, 'QTable')]
+
+
+#---------| Offline |----------#
+def train_from_records(player, file_path):
+    """
+    Train a QPlayer (or every variant of a MultiQPlayer) with a replay buffer on a game record file,
+    learning every game from the point of view of both sides.
+
+    Returns:
+    The number of games read.
+    """
+    games = 0
+    with GameRecordReader(file_path) as reader:
+        for moves, winner in reader:
+            game = Gomoku(size=reader.size, pieces_in_row_to_win=reader.pieces_in_row_to_win)
+            trajectories = {'X': [], 'O': []}
+            for x, y in moves:
+                trajectories[game.current_player].append((game.get_snapshot(), (x, y)))
+                game.move(x, y)
+            for side, trajectory in trajectories.items():
+                for learner in learning_players([player]):
+                    learner.trajectory = list(trajectory)
+                    learner.score(0.5 if winner is None else 1.0 if winner == side else 0.0)
+            games += 1
+            if games % 10000 == 0:
+                print(f'{games} recorded games, table size {table_sizes([player])}')
+    return games
+
+
+#---------| Parallel |---------#
+def play_shard(rows, episodes, seed, size, pieces_in_row_to_win, opponent, options=None):
+    """
+    Worker side of the parallel mode: play `episodes` games with a QPlayer that starts from a copy of
+    the master table, and send back only the rows that changed, as deltas against the starting values.
+    `options` are the QPlayer arguments of the master player (reward, learning_rate, ...).
+    """
+    random.seed(seed)
+    qtable = QTable(size)
+    qtable.rows = {state: dict(values) for state, values in rows.items()}
+    player1 = QPlayer('Trained', qtable=qtable, **(options or {}))
+    player2 = make_opponent(opponent, pieces_in_row_to_win)
+    worker_logger = logging.getLogger('gomoku_worker_logger')
+
+    p1_score, p2_score, draws = 0.0, 0.0, 0
+    for _ in range(episodes):
+        result = GomokuGame(player1, player2, size=size, pieces_in_row_to_win=pieces_in_row_to_win, logger=worker_logger).run_game()
+        p1_score += result[0]
+        p2_score += result[1]
+        if result[0]==result[1]:
+            draws += 1
+
+    deltas = {}
+    for state, values in player1.QTable.rows.items():
+        base = rows.get(state, {})
+        changed = {action: value - base.get(action, 0.0) for action, value in values.items() if value != base.get(action, 0.0)}
+        if changed or state not in rows:
+            deltas[state] = changed
+    return deltas, (p1_score, p2_score, draws)
+
+
+def merge_deltas(qtable, shard_deltas):
+    """
+    Average the deltas of every worker that touched a state and add them to the master table.
+    """
+    merged = {}
+    for deltas in shard_deltas:
+        for state, values in deltas.items():
+            total, count = merged.get(state, ({}, 0))
+            for action, value in values.items():
+                total[action] = total.get(action, 0.0) + value
+            merged[state] = (total, count + 1)
+    for state, (total, count) in merged.items():
+        row = qtable.add_row(state)
+        for action, value in total.items():
+            row[action] = row.get(action, 0.0) + value / count
+
+
+def run_parallel_episodes(player1, training_episodes, workers, sync_every, seed, size=3, pieces_in_row_to_win=3, opponent='perfect', checkpoints=None, resume=None,
+                          options=None):
+    """
+    Shard the episodes over a process pool. Every round each worker plays `sync_every` episodes from
+    the current master table, then the deltas are merged back before the next round starts. Worker
+    seeds only depend on `seed`, the round and the worker number, so runs are reproducible, and
+    checkpoints are taken between rounds.
+    """
+    p1_score, p2_score, draws = 0.0, 0.0, 0
+    played, sync_round = 0, 0
+    if resume:
+        played, sync_round = resume['episode'], resume['sync_round']
+        p1_score, p2_score, draws = resume['scores']
+    with Pool(workers) as pool:
+        while played < training_episodes:
+            round_episodes = min(sync_every * workers, training_episodes - played)
+            shards = [round_episodes // workers + (1 if w < round_episodes % workers else 0) for w in range(workers)]
+            jobs = [(player1.QTable.rows, episodes, seed + sync_round * workers + w, size, pieces_in_row_to_win, opponent, options) for w, episodes in enumerate(shards) if episodes]
+            results = pool.starmap(play_shard, jobs)
+            merge_deltas(player1.QTable, [deltas for deltas, _ in results])
+
+            d_p1 = sum(scores[0] for _, scores in results)
+            d_p2 = sum(scores[1] for _, scores in results)
+            d_draws = sum(scores[2] for _, scores in results)
+            p1_score, p2_score, draws = p1_score + d_p1, p2_score + d_p2, draws + d_draws
+            played += round_episodes
+            sync_round += 1
+            logger.info(f'Round {sync_round}, {played} episodes, table size {len(player1.QTable)}')
+            print_scores(played, d_p1, d_p2, d_draws)
+            if checkpoints and (played == training_episodes or checkpoints.due(played)):
+                checkpoints.save(played, capture_state([player1], 'parallel', size, pieces_in_row_to_win, played, (p1_score, p2_score, draws),
+                                                       sync_round=sync_round))
+
+    return p1_score, p2_score, draws
+
+
+def make_opponent(opponent, pieces_in_row_to_win):
+    if opponent == 'perfect':
+        return create_player('perfect', 'Perfect')
+    if opponent == 'search':
+        return create_player('search', 'Search', pieces_in_row_to_win=pieces_in_row_to_win, time_limit=0.1)
+    return create_player('random', 'Random')
+
+
+#----------| Report |----------#
+def table_sizes(players):
+    return ', '.join(str(len(player.QTable)) for player in learning_players(players))
+
+
+def print_scores(i, d_p1, d_p2, d_draws):
+    log_str = f'After {i} episodes, scores: {d_p1}, {d_p2}, draws {d_draws} (p1 win = {d_p1-d_draws/2}, p2 win = {d_p2-d_draws/2})'
+    print(log_str)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the QPlayer, by default against the PerfectPlayer on a 3x3 board.')
+    parser.add_argument('training_episodes', type=int, nargs='?', default=100)
+    parser.add_argument('--name', default='Trained', help='QPlayer name, its table is Qtable_<name>.csv')
+    parser.add_argument('--size', type=int, default=3, help='Board size')
+    parser.add_argument('--pieces-in-row-to-win', type=int, default=3, help='Pieces in a row needed to win')
+    parser.add_argument('--opponent', choices=['perfect', 'random', 'search'], default='perfect', help='Player 2 (perfect only plays 3x3)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of self-play worker processes (1 plays serially)')
+    parser.add_argument('--sync-every', type=int, default=100, help='Episodes each worker plays between Q-table merges')
+    parser.add_argument('--seed', type=int, default=0, help='Base seed of the parallel workers')
+    parser.add_argument('--replay', type=int, default=0, help='Learn from an experience replay buffer of this many moves (serial mode, 0 learns online)')
+    parser.add_argument('--replay-batch', type=int, default=None, help='Episodes replayed after every game (default 8)')
+    parser.add_argument('--prioritized', action='store_true', help='Sample replayed episodes by their TD error')
+    parser.add_argument('--print-board', action='store_true', help='Print the board after every move (serial mode)')
+    parser.add_argument('--log-moves-every', type=int, default=100, help='Log the moves of one game in this many (serial mode, 0 logs none)')
+    parser.add_argument('--records', help='Append every game to this game record file (serial mode)')
+    parser.add_argument('--from-records', help='Train offline on a game record file instead of playing')
+    parser.add_argument('--stats', help='Write timing stats to this file, Prometheus text for .prom and JSON otherwise (serial mode)')
+    parser.add_argument('--profile-every', type=int, default=None, help='With --stats, profile one episode in this many into gomoku_profile.prof')
+    parser.add_argument('--reward', choices=list(REWARD_POLICIES), default='standard', help='Reward policy of the QPlayer (aggressive keeps its table in Qtable_Agressive_<name>.csv)')
+    parser.add_argument('--variants', nargs='*', choices=list(REWARD_POLICIES), default=[],
+                        help='More reward policies to train in the same games, each with its own table (serial mode)')
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+    parser.add_argument('--gamma', type=float, default=DISCOUNT_FACTOR_GAMMA, help='Discount factor')
+    parser.add_argument('--exploration', choices=list(EXPLORATIONS), default='greedy', help='How moves are picked in known states (serial mode)')
+    parser.add_argument('--exploration-start', type=float, help='Starting epsilon or softmax temperature')
+    parser.add_argument('--exploration-end', type=float, help='Final epsilon or softmax temperature')
+    parser.add_argument('--exploration-episodes', type=int, help='Episodes over which the exploration decays from start to end')
+    parser.add_argument('--checkpoint', help='Checkpoint file, Checkpoint_<name>.pkl by default')
+    parser.add_argument('--checkpoint-every', type=int, default=0, help='Checkpoint every this many episodes (0 never)')
+    parser.add_argument('--checkpoint-seconds', type=float, default=0, help='Checkpoint every this many seconds (0 never)')
+    parser.add_argument('--resume', action='store_true', help='Continue the run saved in the checkpoint file up to training_episodes; '
+                        'games recorded with --records after that checkpoint are recorded again')
+    args = parser.parse_args()
+    if args.workers > 1 and (args.variants or args.exploration != 'greedy'):
+        parser.error('--variants and --exploration only train in serial mode')
+    if args.workers > 1 and (args.replay or args.replay_batch is not None or args.prioritized):
+        parser.error('--replay, --replay-batch and --prioritized only train in serial mode')
+    if args.workers > 1 and args.stats:
+        parser.error('--stats only measures serial training')
+    if args.workers > 1 and args.records:
+        parser.error('--records only records serial training')
+    if args.replay_batch is None:
+        args.replay_batch = 8
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    training_episodes = args.training_episodes
+
+    # Offline training always learns through a replay buffer
+    replay_capacity = args.replay or (100000 if args.from_records else 0)
+    checkpoint_path = args.checkpoint or f'./Checkpoint_{args.name}.pkl'
+    resume = Checkpointer.load(checkpoint_path) if args.resume else None
+    if args.resume and resume is None:
+        print(f'No checkpoint in {checkpoint_path}, starting a new run')
+    # The first reward policy picks the moves; every policy learns from them with its own table, replay
+    # buffer and exploration schedule. A resumed player gets its table from the checkpoint instead of
+    # Qtable_<name>.csv
+    rewards = [args.reward] + [reward for reward in dict.fromkeys(args.variants) if reward != args.reward]
+    options = {'learning_rate': args.learning_rate, 'discount_factor_gamma': args.gamma}
+    learners = [make_learner(args.name, reward, qtable=QTable(args.size) if resume else None, size=args.size, replay_batch=args.replay_batch,
+                             replay=ReplayBuffer(replay_capacity, args.size, args.prioritized, seed=args.seed) if replay_capacity else None,
+                             exploration=make_exploration(args.exploration, args.exploration_start, args.exploration_end, args.exploration_episodes),
+                             **options)
+                for reward in rewards]
+    player1_buffer = [learners[0] if len(learners) == 1 else MultiQPlayer(learners)]
+
+    if args.from_records:
+        games = train_from_records(player1_buffer[0], args.from_records)
+        print(f'Trained on {games} recorded games, table size {table_sizes(player1_buffer)}')
+        player1_buffer[0].shutdown()
+        sys.exit()
+
+    player2_buffer = [make_opponent(args.opponent, args.pieces_in_row_to_win)]
+    #player2_buffer = [create_player('human', 'HumanPlayer')]
+
+    mode = 'parallel' if args.workers > 1 else 'serial'
+    if resume:
+        restore_state(player1_buffer, resume, mode, args.size, args.pieces_in_row_to_win)
+        print(f"Resuming from episode {resume['episode']}, table size {table_sizes(player1_buffer)}")
+    checkpoints = None
+    if args.checkpoint_every or args.checkpoint_seconds or args.resume:
+        checkpoints = Checkpointer(checkpoint_path, args.checkpoint_every, args.checkpoint_seconds)
+        checkpoints.start_from(resume['episode'] if resume else 0)
+
+    try:
+        if args.workers > 1:
+            p1_score, p2_score, draws = run_parallel_episodes(player1_buffer[0], training_episodes, args.workers, args.sync_every, args.seed,
+                                                              args.size, args.pieces_in_row_to_win, args.opponent, checkpoints, resume,
+                                                              dict(options, reward=args.reward))
+        else:
+            stats = GameStats(profile_every=args.profile_every) if args.stats else None
+            records = GameRecordWriter(args.records, args.size, args.pieces_in_row_to_win) if args.records else None
+            p1_score, p2_score, draws = run_episodes(player1_buffer, player2_buffer, training_episodes, args.size, args.pieces_in_row_to_win,
+                                                     args.print_board, stats, args.log_moves_every, records, checkpoints, resume)
+            if stats:
+                stats.export(args.stats)
+            if records:
+                records.close()
+    finally:
+        # Lets the last checkpoint reach the disk, even when the run is interrupted
+        if checkpoints:
+            checkpoints.close()
+
+    log_str = f'{training_episodes} episodes. Scores: {p1_score}, {p2_score}, draws {draws} | p1 win = {int(p1_score-draws/2)} ({(p1_score-draws/2)/training_episodes*100:.2f}%), p2 win = {int(p2_score-draws/2)} ({(p2_score-draws/2)/training_episodes*100:.2f}%)'
+    logger.info(log_str)
+    print(log_str)
+
+    print(f'model perf. diff {((p1_score-draws/2)/training_episodes*100 - (p2_score-draws/2)/training_episodes*100):.2f}')
 
-player1_buffer = [QPlayer('Trained')]
-
-player2_buffer = [PerfectPlayer('Perfect')]
-#player2_buffer = [HumanPlayer('HumanPlayer')]
-
-p1_score, p2_score, draws = 0.0, 0.0, 0
-t_p1_score, t_p2_score, t_draws = 0.0, 0.0, 0
-
-for i in range(1, training_episodes + 1):
-    player1 = random.choice(player1_buffer)
-    player2 = random.choice(player2_buffer)
-    logger.info(f'Player1 type {type(player1)}, Player2 type {type(player2)}')
-    game = GomokuGame(player1, player2, size=3, pieces_in_row_to_win=3, logger=logger, print_board=True)
-    result = game.run_game()
-    logger.info(f'Episode {i}, {result}')
-    p1_score += result[0]
-    p2_score += result[1]
-    if result[0]==result[1]:
-        draws += 1
-    if i % 100 == 0 :
-        d_p1 = p1_score - t_p1_score
-        d_p2 = p2_score - t_p2_score
-        d_draws = draws - t_draws
-        log_str = f'After {i} episodes, scores: {d_p1}, {d_p2}, draws {d_draws} (p1 win = {d_p1-d_draws/2}, p2 win = {d_p2-d_draws/2})'
-        print(log_str)
-        t_p1_score, t_p2_score, t_draws = p1_score, p2_score, draws
-
-log_str = f'{training_episodes} episodes. Scores: {p1_score}, {p2_score}, draws {draws} | p1 win = {int(p1_score-draws/2)} ({(p1_score-draws/2)/training_episodes*100:.2f}%), p2 win = {int(p2_score-draws/2)} ({(p2_score-draws/2)/training_episodes*100:.2f}%)'
-logger.info(log_str)
-print(log_str)
-
-print(f'model perf. diff {((p1_score-draws/2)/training_episodes*100 - (p2_score-draws/2)/training_episodes*100):.2f}')
-
-for p in player1_buffer:
-    p.shutdown() 
-for p in player2_buffer:
-    p.shutdown()
\ No newline at end of file
+    for p in player1_buffer:
+        p.shutdown()
+    for p in player2_buffer:
+        p.shutdown()